@@ -0,0 +1,49 @@
+"""
+Filename: bench_doc_memory.py
+Description: compares full OpenLibrary docs with projected BookRecords
+
+Run from the project root: python benchmarks/bench_doc_memory.py
+
+The projected payload is what the API sends back when the title search
+asks for Books_API.TITLE_FIELDS with the fields= query parameter.
+"""
+
+import sys
+sys.path.append('.')
+
+import json
+import time
+import tracemalloc
+from library.ext_api_interface import Books_API, project_response
+
+ROUNDS = 50
+
+def retained(build):
+    """Measures the memory still held by the object build() returns."""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+def parse_time(payload):
+    """Gets the mean time to json.loads the payload in milliseconds."""
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        json.loads(payload)
+    return (time.perf_counter() - start) * 1000 / ROUNDS
+
+if __name__ == "__main__":
+    with open('tests_data/json_data.txt', 'r') as f:
+        full = f.read()
+    fields = Books_API.TITLE_FIELDS
+    docs = json.loads(full)['docs']
+    projected = json.dumps({'docs': [{key: doc[key] for key in fields if key in doc}
+                                     for doc in docs]})
+
+    print("%-18s %12s %12s %14s" % ("", "payload", "parse", "retained"))
+    print("%-18s %10d B %9.3f ms %12d B" % ("full docs", len(full), parse_time(full),
+                                            retained(lambda: json.loads(full))))
+    print("%-18s %10d B %9.3f ms %12d B" % ("BookRecords", len(projected), parse_time(projected),
+          retained(lambda: project_response(json.loads(projected), fields))))
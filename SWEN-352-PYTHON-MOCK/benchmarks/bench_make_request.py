@@ -0,0 +1,43 @@
+"""
+Filename: bench_make_request.py
+Description: compares per-call connections with the pooled Books_API session
+
+Run from the project root: python benchmarks/bench_make_request.py
+
+The stub server delays every new connection by CONNECT_DELAY seconds, which
+stands in for the TCP/TLS handshake to openlibrary.org.
+"""
+
+import sys
+sys.path.append('.')
+
+import time
+import requests
+from library.ext_api_interface import Books_API
+from benchmarks.stub_server import StubServer
+
+REQUESTS = 300
+CONNECT_DELAY = 0.02
+
+def percentile(samples, pct):
+    """Gets the given percentile of a list of samples."""
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+    return samples[index]
+
+def run(label, get, url):
+    """Times REQUESTS calls of get(url) and prints p50/p99 in milliseconds."""
+    timings = []
+    for i in range(REQUESTS):
+        start = time.perf_counter()
+        get("%s?q=learning+python&n=%d" % (url, i)).content
+        timings.append((time.perf_counter() - start) * 1000)
+    print("%-22s p50 %7.3f ms   p99 %7.3f ms" % (label, percentile(timings, 50),
+                                                percentile(timings, 99)))
+
+if __name__ == "__main__":
+    with StubServer(connect_delay=CONNECT_DELAY) as server:
+        run("requests.get per call", requests.get, server.url)
+        api = Books_API()
+        run("pooled Books_API", api.session.get, server.url)
+        api.close()
@@ -0,0 +1,77 @@
+"""
+Filename: bench_patron.py
+Description: compares the slotted Patron with the earlier list-based one
+
+Run from the project root: python benchmarks/bench_patron.py [loans] [patrons]
+
+ListPatron below is the Patron as it was before: a __dict__ per instance
+and borrowed books kept in a list.
+"""
+
+import sys
+sys.path.append('.')
+
+import gc
+import time
+import tracemalloc
+from library.patron import Patron
+
+class ListPatron:
+    """The earlier Patron: attributes in __dict__, borrowed books in a list."""
+
+    def __init__(self, fname, lname, age, memberID):
+        self.fname = fname
+        self.lname = lname
+        self.age = age
+        self.memberID = memberID
+        self.borrowed_books = []
+
+    def add_borrowed_book(self, book):
+        book = book.lower()
+        if book in self.borrowed_books:
+            return
+        self.borrowed_books.append(book)
+
+    def has_borrowed_book(self, book):
+        return book.lower() in self.borrowed_books
+
+    def return_borrowed_book(self, book):
+        book = book.lower()
+        if book in self.borrowed_books:
+            self.borrowed_books.remove(book)
+
+def loans(patron_cls, count):
+    """Times borrowing, checking and returning count books on one Patron."""
+    titles = ['Book Number %d' % i for i in range(count)]
+    patron = patron_cls('Ann', 'Lee', 30, 1)
+    start = time.perf_counter()
+    for title in titles:
+        patron.add_borrowed_book(title)
+    for title in titles:
+        patron.has_borrowed_book(title)
+    for title in titles:
+        patron.return_borrowed_book(title)
+    return time.perf_counter() - start
+
+def held(patron_cls, count):
+    """Measures the memory held by count Patrons with two loans each."""
+    gc.collect()
+    tracemalloc.start()
+    patrons = []
+    for memberID in range(count):
+        patron = patron_cls(''.join(['A', 'nn']), ''.join(['L', 'ee']), 30, memberID)
+        patron.add_borrowed_book('Learning Python')
+        patron.add_borrowed_book('Dune')
+        patrons.append(patron)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+if __name__ == "__main__":
+    loan_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    patron_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    print("%-12s %22s %22s" % ("", "%d loans" % loan_count, "%d patrons" % patron_count))
+    for patron_cls in (ListPatron, Patron):
+        print("%-12s %19.2f ms %19.1f MB" % (patron_cls.__name__,
+                                              loans(patron_cls, loan_count) * 1000,
+                                              held(patron_cls, patron_count) / 2 ** 20))
@@ -0,0 +1,53 @@
+"""
+Filename: bench_patron_import.py
+Description: compares one register_patron call per Patron with a bulk import
+
+Run from the project root: python benchmarks/bench_patron_import.py [count]
+"""
+
+import sys
+sys.path.append('.')
+
+import json
+import os
+import tempfile
+import time
+from library import patron_io
+from library.library import Library
+from library.library_db_interface import Library_DB
+from library.sqlite_backend import SQLiteBackend
+
+def write_jsonl(path, count):
+    """Writes count generated Patrons to a JSON lines file."""
+    with open(path, 'w') as f:
+        for memberID in range(count):
+            f.write(json.dumps({'fname': 'Ann', 'lname': 'Lee', 'age': 30,
+                                'memberID': memberID}) + '\n')
+
+def timed(fn):
+    """Gets the number of seconds fn takes to run."""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'patrons.jsonl')
+        write_jsonl(source, count)
+
+        # one call per Patron rewrites the whole file each time, so only a
+        # small sample is timed and the rate is scaled up
+        sample = min(count, 2000)
+        library = Library(db=Library_DB(os.path.join(tmp, 'single.json')))
+        seconds = timed(lambda: [library.register_patron('Ann', 'Lee', 30, memberID)
+                                 for memberID in range(sample)])
+        library.db.close_db()
+        print("%-24s %8.2f s for %d (%d/s)" % ("register_patron", seconds, sample, sample / seconds))
+
+        for name, db in (("import_jsonl TinyDB", Library_DB(os.path.join(tmp, 'bulk.json'))),
+                         ("import_jsonl SQLite",
+                          Library_DB(backend=SQLiteBackend(os.path.join(tmp, 'bulk.sqlite3'))))):
+            seconds = timed(lambda: patron_io.import_jsonl(db, source))
+            db.close_db()
+            print("%-24s %8.2f s for %d (%d/s)" % (name, seconds, count, count / seconds))
@@ -0,0 +1,56 @@
+"""
+Filename: bench_storage.py
+Description: compares the patron storage backends on loading, checkouts and reopening
+
+Run from the project root: python benchmarks/bench_storage.py [count ...]
+
+Each backend is filled with count patrons, then patrons are updated one
+at a time, the way a checkout updates them, for up to UPDATE_SECONDS.
+"""
+
+import sys
+sys.path.append('.')
+
+import os
+import tempfile
+import time
+from library.library_db_interface import Library_DB
+from library.log_backend import LogBackend
+from library.patron import Patron
+from library.sqlite_backend import SQLiteBackend
+from library.tinydb_backend import TinyDBBackend
+
+UPDATE_SECONDS = 5
+BACKENDS = (('TinyDB', TinyDBBackend, 'db.json'),
+            ('SQLite', SQLiteBackend, 'db.sqlite3'),
+            ('log', LogBackend, 'db.log'))
+
+def run(name, backend_cls, path, count):
+    """Times loading, updating and reopening one backend."""
+    db = Library_DB(backend=backend_cls(path))
+    start = time.perf_counter()
+    db.insert_patrons(Patron('Ann', 'Lee', 30, memberID) for memberID in range(count))
+    load = time.perf_counter() - start
+
+    updates = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < UPDATE_SECONDS and updates < 10000:
+        patron = Patron('Ann', 'Lee', 30, updates % count)
+        patron.add_borrowed_book('book%d' % updates)
+        db.update_patron(patron)
+        updates += 1
+    update = (time.perf_counter() - start) * 1000 / updates
+    db.close_db()
+
+    start = time.perf_counter()
+    Library_DB(backend=backend_cls(path)).close_db()
+    reopen = time.perf_counter() - start
+    print("%-8s %9d %9.2f s %12.3f ms %9.2f s" % (name, count, load, update, reopen))
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    print("%-8s %9s %11s %15s %11s" % ("backend", "patrons", "load", "per update", "reopen"))
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, backend_cls, filename in BACKENDS:
+                run(name, backend_cls, os.path.join(tmp, filename), count)
@@ -0,0 +1,62 @@
+"""
+Filename: stub_server.py
+Description: local HTTP server that serves the recorded OpenLibrary payloads
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every GET with the recorded search.json payload."""
+
+    protocol_version = 'HTTP/1.1'
+    body = b''
+    connect_delay = 0.0
+
+    def setup(self):
+        """Waits connect_delay seconds per new connection to mimic a remote handshake."""
+        time.sleep(self.connect_delay)
+        super().setup()
+
+    def do_GET(self):
+        """Sends the recorded payload, keeping the connection open."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        """Silences the per-request access log."""
+        pass
+
+class StubServer:
+    """Runs a StubHandler server on a background thread."""
+
+    def __init__(self, data_file='tests_data/json_data.txt', connect_delay=0.0):
+        """Constructor for the StubServer class.
+
+        :param data_file: the file whose content is served for every request
+        :param connect_delay: seconds added to the setup of every new connection
+        """
+        with open(data_file, 'rb') as f:
+            body = f.read()
+        handler = type('Handler', (StubHandler,), {'body': body, 'connect_delay': connect_delay})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """The search.json URL of the running server."""
+        host, port = self.server.server_address
+        return "http://%s:%d/search.json" % (host, port)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,306 @@
+"""
+Filename: async_ext_api_interface.py
+Description: asyncio counterpart of ext_api_interface for concurrent lookups
+"""
+
+import asyncio
+import json
+import time
+import aiohttp
+from library.ext_api_interface import (Books_API, normalize_url, project_docs, project_response,
+                                       has_docs, titles_from_docs, book_info_from_docs,
+                                       ebooks_from_docs, summary_from_docs,
+                                       IncompleteSearchError)
+from library.response_cache import ResponseCache
+from library.search_result import SearchResult
+from library.single_flight import AsyncSingleFlight
+from library.circuit_breaker import CircuitBreaker
+
+class AsyncBooks_API:
+    """Class used for interacting with the OpenLibrary API from asyncio code."""
+
+    API_URL = Books_API.API_URL
+    PAGE_SIZE = Books_API.PAGE_SIZE
+    RETRY_STATUSES = Books_API.RETRY_STATUSES
+    AUTHOR_FIELDS = Books_API.AUTHOR_FIELDS
+    TITLE_FIELDS = Books_API.TITLE_FIELDS
+
+    search_url = Books_API.search_url
+
+    def __init__(self, max_concurrency=100, timeout=10, pool_size=100, pool_size_per_host=0,
+                 cache=None, store=None, max_retries=2, backoff=0.05, retry_budget=15,
+                 breaker=None, connect_timeout=3.05, read_timeout=10):
+        """Constructor for the AsyncBooks_API class.
+
+        The aiohttp session is opened on first use so the object can be built
+        outside of a running event loop.
+
+        :param max_concurrency: the maximum number of requests in flight at once
+        :param timeout: the number of seconds a single attempt may take
+        :param pool_size: the maximum number of pooled connections
+        :param pool_size_per_host: the maximum pooled connections per host, 0 for no limit
+        :param cache: the ResponseCache shared by the query methods, a default one if None
+        :param store: a ResponseStore to record responses to or replay them from
+        :param max_retries: the number of times a failed request is retried
+        :param backoff: the delay before the first retry, doubled for each retry after it
+        :param retry_budget: the number of seconds one call may spend on all its attempts
+        :param breaker: the CircuitBreaker guarding the API, a default one if None
+        :param connect_timeout: the number of seconds to wait for a connection
+        :param read_timeout: the number of seconds to wait between reads of the response
+        """
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.cache = cache if cache is not None else ResponseCache()
+        self.flights = AsyncSingleFlight()
+        self.store = store
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retry_budget = retry_budget
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = 0
+        self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def get_session(self):
+        """Gets the shared aiohttp session, opening it on first use.
+        
+        :returns: the aiohttp.ClientSession
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size,
+                                             limit_per_host=self.pool_size_per_host)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        """Closes the session and every pooled connection it holds."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    stats = Books_API.stats
+
+    async def make_request(self, url, fields=None):
+        """Makes a HTTP request to the given URL.
+
+        Tasks asking for the same URL at once share one request.
+        
+        :param url: the url used for the HTTP request
+        :param fields: the doc fields to keep as BookRecords, None for the raw docs
+        :returns: the JSON body of the request, None if non 200 status code, connection error or timeout
+        """
+        key = (normalize_url(url), fields)
+        json_data = self.cache.get(key)
+        if json_data is not None:
+            return json_data
+        return await self.flights.do(key, self.fetch, key, url, fields)
+
+    async def fetch(self, key, url, fields):
+        """Requests the given URL and caches a successful response.
+
+        With a replaying store the response comes from the store and no
+        request is sent; with a recording store the response is added to it.
+        While the circuit breaker is open no request is sent either, and the
+        last cached response, however old, is returned instead.
+        
+        :param key: the cache key of the request
+        :param url: the url used for the HTTP request
+        :param fields: the doc fields to keep as BookRecords, None for the raw docs
+        :returns: the JSON body of the request, None if non 200 status code, connection error or timeout
+        """
+        if self.store is not None and self.store.replaying:
+            body = self.store.get(key[0])
+            if body is None:
+                return None
+        else:
+            if not self.breaker.allow_request():
+                return self.cache.get(key, stale=True)
+            status, body = await self.get_with_retries(url)
+            if status != 200:
+                return None
+            if self.store is not None:
+                self.store.put(key[0], body)
+        json_data = json.loads(body)
+        if fields is not None:
+            json_data = project_response(json_data, fields)
+        self.cache.put(key, json_data, len(body))
+        return json_data
+
+    async def get_with_retries(self, url):
+        """Sends a GET request, retrying connection errors, timeouts and 5xx/429 responses.
+
+        Retries back off exponentially and stop once the next attempt would
+        go past the retry budget, and each attempt's timeouts are cut down to
+        what is left of it. The outcome is reported to the breaker,
+        including when the task is cancelled or an unexpected exception ends
+        the call.
+        
+        :param url: the url used for the HTTP request
+        :returns: the last status and body, (None, None) if no response was received
+        """
+        deadline = time.monotonic() + self.retry_budget
+        attempt = 0
+        healthy = False
+        try:
+            while True:
+                status, body = None, None
+                remaining = max(deadline - time.monotonic(), 0.001)
+                timeout = aiohttp.ClientTimeout(total=min(self.timeout.total, remaining),
+                                                connect=min(self.connect_timeout, remaining),
+                                                sock_read=min(self.read_timeout, remaining))
+                async with self.semaphore:
+                    try:
+                        async with self.get_session().get(url, timeout=timeout) as response:
+                            status = response.status
+                            if status == 200:
+                                body = await response.read()
+                    except (aiohttp.ClientError, asyncio.TimeoutError):
+                        pass
+                if status is not None and status not in self.RETRY_STATUSES:
+                    healthy = True
+                    return status, body
+                delay = self.backoff * 2 ** attempt
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    return status, body
+                self.retries += 1
+                await asyncio.sleep(delay)
+                attempt += 1
+        finally:
+            # report every way out, cancellation included, so a half-open
+            # breaker is never left waiting on its probe
+            if healthy:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    async def iter_pages(self, param, value, fields, prefetch=False):
+        """Yields the docs of a search one page at a time.
+
+        Pages are fetched only as the consumer asks for them. With prefetch
+        the next page is requested in a task while the current one is consumed.
+        As with Books_API.iter_pages, a page after the first failing raises.
+        
+        :param param: the search parameter, 'q' for titles or 'author'
+        :param value: the searched title or author
+        :param fields: the doc fields to request and keep
+        :param prefetch: True to fetch the next page in the background
+        :returns: an async generator of BookRecord lists
+        :raises IncompleteSearchError: if a page after the first cannot be fetched
+        """
+        next_page = None
+        offset = 0
+        json_data = await self.make_request(self.search_url(param, value, fields), fields)
+        try:
+            while True:
+                docs = project_docs(json_data, fields)
+                offset += len(docs)
+                total = json_data.get('numFound') if json_data else None
+                more = len(docs) >= self.PAGE_SIZE and (total is None or offset < total)
+                if more and prefetch:
+                    next_page = asyncio.ensure_future(self.make_request(
+                        self.search_url(param, value, fields, offset), fields))
+                if docs:
+                    yield docs
+                if not more:
+                    return
+                if next_page:
+                    json_data = await next_page
+                else:
+                    json_data = await self.make_request(
+                        self.search_url(param, value, fields, offset), fields)
+                if json_data is None:
+                    raise IncompleteSearchError("page at offset %d of %s=%s failed"
+                                                % (offset, param, value))
+        finally:
+            if next_page:
+                next_page.cancel()
+
+    async def iter_books_by_author(self, author, prefetch=False):
+        """Yields the books written by a given author, across every result page.
+        
+        :param author: the name of the author
+        :param prefetch: True to fetch the next page in the background
+        :returns: an async generator of book titles
+        """
+        async for docs in self.iter_pages('author', author, self.AUTHOR_FIELDS, prefetch):
+            for title in titles_from_docs(docs):
+                yield title
+
+    async def iter_book_info(self, book, prefetch=False):
+        """Yields the information for a given book, across every result page.
+        
+        :param book: the title of the book
+        :param prefetch: True to fetch the next page in the background
+        :returns: an async generator of dictionaries with book data
+        """
+        async for docs in self.iter_pages('q', book, self.TITLE_FIELDS, prefetch):
+            for info in book_info_from_docs(docs):
+                yield info
+
+    async def iter_ebooks(self, book, prefetch=False):
+        """Yields the ebooks for a given book, across every result page.
+        
+        :param book: the title of the book
+        :param prefetch: True to fetch the next page in the background
+        :returns: an async generator of data about the ebooks
+        """
+        async for docs in self.iter_pages('q', book, self.TITLE_FIELDS, prefetch):
+            for ebook in ebooks_from_docs(docs):
+                yield ebook
+
+    async def is_book_available(self, book):
+        """Determines if a given book is available to borrow.
+        
+        :param book: the title of the book
+        :returns: True if available, False if not
+        """
+        request_url = self.search_url('q', book, self.TITLE_FIELDS)
+        return has_docs(await self.make_request(request_url, self.TITLE_FIELDS))
+
+    async def books_by_author(self, author):
+        """Gets all the books written by a given author.
+        
+        :param author: the name of the author
+        :returns: the titles of all the books as a SearchResult
+        """
+        result = SearchResult()
+        async for docs in self.iter_pages('author', author, self.AUTHOR_FIELDS):
+            result.add_titles(docs)
+        return result
+
+    async def get_book_summary(self, book):
+        """Gets whether a book is available and an ebook, its ebook count and languages.
+        
+        :param book: the title of the book
+        :returns: a BookSummary
+        """
+        pages = [docs async for docs in self.iter_pages('q', book, self.TITLE_FIELDS)]
+        return summary_from_docs(book, pages)
+
+    async def get_book_info(self, book):
+        """Gets the information for a given book.
+        
+        :param book: the title of the book
+        :returns: a list of dictionaries with book data
+        """
+        return [info async for info in self.iter_book_info(book)]
+
+    async def get_ebooks(self, book):
+        """Gets the ebooks for a given book.
+        
+        :param book: the title of the book
+        :returns: data about the ebooks as a SearchResult
+        """
+        result = SearchResult()
+        async for docs in self.iter_pages('q', book, self.TITLE_FIELDS):
+            result.add_ebooks(docs)
+        return result
@@ -0,0 +1,192 @@
+"""
+Filename: book_index.py
+Description: local inverted index over OpenLibrary docs for network-free lookups
+"""
+
+import gzip
+import json
+import re
+import sqlite3
+import threading
+
+TOKEN = re.compile(r'\w+')
+
+def tokenize(text):
+    """Splits text into casefolded word tokens, dropping punctuation.
+    
+    :param text: the text to split
+    :returns: a list of tokens
+    """
+    return TOKEN.findall(text.casefold())
+
+def normalize_title(title):
+    """Normalizes a title for comparison, ignoring case, punctuation and spacing.
+    
+    :param title: the title of the book
+    :returns: the normalized title
+    """
+    return ' '.join(tokenize(title))
+
+class BookIndex:
+    """On-disk inverted index from title and author tokens to OpenLibrary docs.
+
+    The index is kept in a SQLite file: one row per doc, and one posting per
+    (token, field, doc). Adding a doc whose key is already indexed replaces
+    it, so dumps and search responses can be ingested incrementally.
+    """
+
+    TITLE = 't'
+    AUTHOR = 'a'
+    BATCH_SIZE = 10000
+
+    def __init__(self, path, complete=False):
+        """Constructor for the BookIndex class.
+        
+        :param path: the path of the index file, ':memory:' for a temporary index
+        :param complete: True if the index holds every book, so a miss means the book does not exist
+        """
+        self.complete = complete
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                key TEXT UNIQUE NOT NULL,
+                title TEXT NOT NULL,
+                title_norm TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                token TEXT NOT NULL,
+                field TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                PRIMARY KEY (token, field, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+            CREATE INDEX IF NOT EXISTS docs_title ON docs (title_norm);
+        """)
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        """Closes the index file."""
+        self.conn.close()
+
+    def add_docs(self, docs):
+        """Adds OpenLibrary docs to the index, replacing docs with the same key.
+
+        Docs need a 'title'; 'author_name' and 'key' are used when present.
+        
+        :param docs: an iterable of doc dictionaries
+        :returns: the number of docs added
+        """
+        count = 0
+        batch = []
+        for doc in docs:
+            if not doc.get('title'):
+                continue
+            batch.append(doc)
+            if len(batch) >= self.BATCH_SIZE:
+                count += self.add_batch(batch)
+                batch = []
+        if batch:
+            count += self.add_batch(batch)
+        return count
+
+    def add_batch(self, docs):
+        """Adds one batch of docs in a single transaction.
+        
+        :param docs: a list of doc dictionaries
+        :returns: the number of docs added
+        """
+        with self.lock, self.conn:
+            for doc in docs:
+                title = doc['title']
+                key = doc.get('key') or title
+                row = self.conn.execute("SELECT id FROM docs WHERE key = ?", (key,)).fetchone()
+                if row:
+                    doc_id = row[0]
+                    self.conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                    self.conn.execute("UPDATE docs SET title = ?, title_norm = ? WHERE id = ?",
+                                      (title, normalize_title(title), doc_id))
+                else:
+                    doc_id = self.conn.execute(
+                        "INSERT INTO docs (key, title, title_norm) VALUES (?, ?, ?)",
+                        (key, title, normalize_title(title))).lastrowid
+                postings = {(token, self.TITLE, doc_id) for token in tokenize(title)}
+                for author in doc.get('author_name') or []:
+                    postings.update((token, self.AUTHOR, doc_id) for token in tokenize(author))
+                self.conn.executemany("INSERT INTO postings (token, field, doc_id) VALUES (?, ?, ?)",
+                                      postings)
+        return len(docs)
+
+    def add_search_response(self, json_data):
+        """Adds the docs of an OpenLibrary search.json response.
+        
+        :param json_data: the JSON body of a search
+        :returns: the number of docs added
+        """
+        if not json_data:
+            return 0
+        return self.add_docs(json_data['docs'])
+
+    def add_dump(self, path):
+        """Adds the docs of a dump file, streaming it line by line.
+
+        Lines are either OpenLibrary bulk dump rows, whose last tab-separated
+        column is the JSON record, or one JSON doc per line. Files ending in
+        .gz are decompressed on the fly.
+        
+        :param path: the path of the dump file
+        :returns: the number of docs added
+        """
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return self.add_docs(json.loads(line.rsplit('\t', 1)[-1]) for line in f if line.strip())
+
+    def find_query(self, field_tokens):
+        """Builds the query for the ids of the docs holding all of the given tokens.
+        
+        :param field_tokens: a non-empty list of (field, token) pairs
+        :returns: the SQL query and its parameters
+        """
+        query = " INTERSECT ".join(["SELECT doc_id FROM postings WHERE field = ? AND token = ?"]
+                                   * len(field_tokens))
+        return query, [value for pair in field_tokens for value in pair]
+
+    def find(self, field_tokens):
+        """Gets the ids of the docs holding all of the given tokens.
+        
+        :param field_tokens: a list of (field, token) pairs
+        :returns: a list of doc ids
+        """
+        if not field_tokens:
+            return []
+        query, params = self.find_query(field_tokens)
+        with self.lock:
+            return [row[0] for row in self.conn.execute(query, params)]
+
+    def contains_title(self, book):
+        """Determines if a book with every word of the given title is indexed.
+        
+        :param book: the title of the book
+        :returns: True if found, False if not
+        """
+        return bool(self.find([(self.TITLE, token) for token in tokenize(book)]))
+
+    def has_book_by_author(self, author, book):
+        """Determines if the given title is indexed as written by the given author.
+        
+        :param author: the name of the author
+        :param book: the title of the book
+        :returns: True if found, False if not
+        """
+        field_tokens = [(self.AUTHOR, token) for token in tokenize(author)]
+        if not field_tokens:
+            return False
+        query, params = self.find_query(field_tokens)
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM docs WHERE title_norm = ? AND id IN (%s) LIMIT 1"
+                                    % query, [normalize_title(book)] + params).fetchone()
+        return row is not None
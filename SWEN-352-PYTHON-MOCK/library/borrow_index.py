@@ -0,0 +1,71 @@
+"""
+Filename: borrow_index.py
+Description: index from book title to the Patrons who have borrowed it
+"""
+
+import threading
+
+class BorrowIndex:
+    """Maps each borrowed title, lowercased, to the set of memberIDs holding it.
+
+    Titles no longer borrowed by anyone are dropped, so the index only
+    grows with the number of books actually out.
+    """
+
+    def __init__(self):
+        """Constructor for the BorrowIndex class."""
+        self.titles = {}
+        self.lock = threading.Lock()
+
+    def build(self, docs):
+        """Replaces the index with the borrowed books of the Patron documents.
+        
+        :param docs: an iterable of Patron documents, as Library_DB.iter_patrons yields them
+        """
+        titles = {}
+        for doc in docs:
+            for book in doc['borrowed_books']:
+                titles.setdefault(book.lower(), set()).add(doc['memberID'])
+        with self.lock:
+            self.titles = titles
+
+    def add(self, book, memberID):
+        """Records that the Patron has borrowed the book.
+        
+        :param book: the title of the book
+        :param memberID: the ID of the Patron
+        """
+        with self.lock:
+            self.titles.setdefault(book.lower(), set()).add(memberID)
+
+    def remove(self, book, memberID):
+        """Records that the Patron has returned the book.
+        
+        :param book: the title of the book
+        :param memberID: the ID of the Patron
+        """
+        book = book.lower()
+        with self.lock:
+            borrowers = self.titles.get(book)
+            if borrowers is None:
+                return
+            borrowers.discard(memberID)
+            if not borrowers:
+                del self.titles[book]
+
+    def borrowers(self, book):
+        """Gets the Patrons who have borrowed the book.
+        
+        :param book: the title of the book
+        :returns: a frozenset of memberIDs
+        """
+        with self.lock:
+            return frozenset(self.titles.get(book.lower(), ()))
+
+    def count(self, book):
+        """Gets the number of Patrons who have borrowed the book.
+        
+        :param book: the title of the book
+        :returns: the number of borrowed copies
+        """
+        return len(self.titles.get(book.lower(), ()))
@@ -0,0 +1,79 @@
+"""
+Filename: circuit_breaker.py
+Description: circuit breaker used to fail fast while an upstream is unhealthy
+"""
+
+import threading
+import time
+
+class CircuitBreaker:
+    """Circuit breaker with closed, open and half-open states.
+
+    After failure_threshold failures in a row the breaker opens and rejects
+    calls. Once reset_timeout seconds have passed it lets a single probe
+    through; a success closes it again and a failure re-opens it. A probe
+    that never reports back is given up on after another reset_timeout
+    seconds, and the next call becomes a new probe.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        """Constructor for the CircuitBreaker class.
+        
+        :param failure_threshold: the number of failures in a row that opens the breaker
+        :param reset_timeout: the number of seconds to stay open before probing
+        :param clock: the function used to read the current time
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        """Determines if a call may go to the upstream.
+        
+        :returns: True if allowed, False if the call should fail fast
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            now = self.clock()
+            if self.state != self.CLOSED and now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.opened_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """Records a healthy upstream response, closing the breaker."""
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        """Records a failed call, opening the breaker past the threshold."""
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def stats(self):
+        """Gets the state and counters of the breaker.
+        
+        :returns: a dictionary with the state, failures in a row, times opened and rejected calls
+        """
+        with self.lock:
+            return {'state': self.state, 'failures': self.failures,
+                    'times_opened': self.times_opened, 'rejected': self.rejected}
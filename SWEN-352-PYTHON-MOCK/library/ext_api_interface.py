@@ -3,53 +3,334 @@ Filename: ext_api_interface.py
 Description: module used for interacting with a web service
 """
 
+import json
+import time
 import requests
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from library.response_cache import ResponseCache
+from library.single_flight import SingleFlight
+from library.circuit_breaker import CircuitBreaker
+from library.search_result import BookPage, SearchResult, normalized_titles
+from library.book_index import normalize_title
+
+DOC_FIELDS = ('title', 'title_suggest', 'publisher', 'publish_year', 'language', 'ebook_count_i')
+
+# compact stand-in for an OpenLibrary doc, fields not requested are None
+BookRecord = namedtuple('BookRecord', DOC_FIELDS, defaults=(None,) * len(DOC_FIELDS))
+
+# what one title search tells about a book, see Books_API.get_book_summary
+BookSummary = namedtuple('BookSummary', ['available', 'is_ebook', 'ebook_count', 'languages'])
+
+class IncompleteSearchError(Exception):
+    """Raised when a page after the first one of a search cannot be fetched."""
+    pass
+
+def normalize_url(url):
+    """Normalizes a request URL so that equivalent searches share a key.
+
+    The scheme and host are lowercased, query parameters are sorted and
+    their values are whitespace-collapsed and casefolded, since OpenLibrary
+    searches are case-insensitive.
+
+    :param url: the url to normalize
+    :returns: the normalized url
+    """
+    parts = urlsplit(url.strip())
+    query = sorted((key, ' '.join(value.split()).casefold())
+                   for key, value in parse_qsl(parts.query, keep_blank_values=True))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path,
+                       urlencode(query), ''))
 
 class Books_API:
     """Class used for interacting with the OpenLibrary API."""
 
     API_URL = "http://openlibrary.org/search.json"
+    PAGE_SIZE = 100
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    # fields each query method reads from the docs
+    AVAILABLE_FIELDS = ('title',)
+    AUTHOR_FIELDS = ('title_suggest',)
+    BOOK_INFO_FIELDS = ('title', 'publisher', 'publish_year', 'language')
+    EBOOK_FIELDS = ('title', 'ebook_count_i')
+    # title searches ask for the union so the title methods share one response
+    TITLE_FIELDS = tuple(dict.fromkeys(AVAILABLE_FIELDS + BOOK_INFO_FIELDS + EBOOK_FIELDS))
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, session=None,
+                 cache=None, store=None, index=None, connect_timeout=3.05, read_timeout=10,
+                 max_retries=2, backoff=0.05, retry_budget=15, breaker=None):
+        """Constructor for the Books_API class.
+
+        Requests go through one requests.Session so that connections to the
+        API host are kept alive and reused instead of reconnecting each call.
 
-    def make_request(self, url):
+        :param pool_connections: the number of per-host connection pools to keep
+        :param pool_maxsize: the maximum number of connections kept per host
+        :param pool_block: True to wait for a free connection when the pool is full
+        :param session: an existing requests.Session to use instead of a new one
+        :param cache: the ResponseCache shared by the query methods, a default one if None
+        :param store: a ResponseStore to record responses to or replay them from
+        :param index: a BookIndex consulted before searching remotely for membership checks
+        :param connect_timeout: the number of seconds to wait for a connection
+        :param read_timeout: the number of seconds to wait for the response
+        :param max_retries: the number of times a failed request is retried
+        :param backoff: the delay before the first retry, doubled for each retry after it
+        :param retry_budget: the number of seconds one call may spend on all its attempts
+        :param breaker: the CircuitBreaker guarding the API, a default one if None
+        """
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections,
+                                  pool_maxsize=pool_maxsize, pool_block=pool_block)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({'Connection': 'keep-alive'})
+        self.session = session
+        self.cache = cache if cache is not None else ResponseCache()
+        self.flights = SingleFlight()
+        self.store = store
+        self.index = index
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retry_budget = retry_budget
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.retries = 0
+
+    def close(self):
+        """Closes the session and every pooled connection it holds."""
+        self.session.close()
+
+    def stats(self):
+        """Gets the counters of the client for monitoring.
+        
+        :returns: a dictionary with the cache, coalescing, retry and breaker counters
+        """
+        return {'cache': self.cache.stats(), 'coalesced': self.flights.coalesced,
+                'retries': self.retries, 'breaker': self.breaker.stats()}
+
+    def make_request(self, url, fields=None):
         """Makes a HTTP request to the given URL.
+
+        Successful responses are cached under the normalized URL, so the
+        query methods that build the same search share one download, and
+        threads asking for the same URL at once share one request.
         
         :param url: the url used for the HTTP request
+        :param fields: the doc fields to keep as BookRecords, None for the raw docs
         :returns: the JSON body of the request, None if non 200 status code or ConnectionError
         """
-        try:
-            response = requests.get(url)
-            if response.status_code != 200:
+        key = (normalize_url(url), fields)
+        json_data = self.cache.get(key)
+        if json_data is not None:
+            return json_data
+        return self.flights.do(key, self.fetch, key, url, fields)
+
+    def fetch(self, key, url, fields):
+        """Requests the given URL and caches a successful response.
+
+        With a replaying store the response comes from the store and no
+        request is sent; with a recording store the response is added to it.
+        While the circuit breaker is open no request is sent either, and the
+        last cached response, however old, is returned instead.
+        
+        :param key: the cache key of the request
+        :param url: the url used for the HTTP request
+        :param fields: the doc fields to keep as BookRecords, None for the raw docs
+        :returns: the JSON body of the request, None if non 200 status code or ConnectionError
+        """
+        if self.store is not None and self.store.replaying:
+            body = self.store.get(key[0])
+            if body is None:
                 return None
-            return response.json()
-        except requests.ConnectionError:
-            return None
+            json_data = json.loads(body)
+        else:
+            if not self.breaker.allow_request():
+                return self.cache.get(key, stale=True)
+            response = self.get_with_retries(url)
+            if response is None or response.status_code != 200:
+                return None
+            json_data = response.json()
+            body = response.content
+            if self.store is not None:
+                self.store.put(key[0], body)
+        if fields is not None:
+            json_data = project_response(json_data, fields)
+        self.cache.put(key, json_data, len(body))
+        return json_data
+
+    def get_with_retries(self, url):
+        """Sends a GET request, retrying request errors, timeouts and 5xx/429 responses.
+
+        Retries back off exponentially and stop once the next attempt would
+        go past the retry budget. The outcome is reported to the breaker,
+        including when an unexpected exception ends the call.
+        
+        :param url: the url used for the HTTP request
+        :returns: the last response, None if no response was received
+        """
+        deadline = time.monotonic() + self.retry_budget
+        attempt = 0
+        healthy = False
+        try:
+            while True:
+                remaining = max(deadline - time.monotonic(), 0.001)
+                try:
+                    response = self.session.get(url, timeout=(min(self.connect_timeout, remaining),
+                                                              min(self.read_timeout, remaining)))
+                    failed = response.status_code in self.RETRY_STATUSES
+                except requests.RequestException:
+                    response = None
+                    failed = True
+                if not failed:
+                    healthy = True
+                    return response
+                delay = self.backoff * 2 ** attempt
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    return response
+                self.retries += 1
+                time.sleep(delay)
+                attempt += 1
+        finally:
+            # report every way out, an exception included, so a half-open
+            # breaker is never left waiting on its probe
+            if healthy:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def search_url(self, param, value, fields, offset=0):
+        """Builds the URL for one page of a search.
+        
+        :param param: the search parameter, 'q' for titles or 'author'
+        :param value: the searched title or author
+        :param fields: the doc fields to request
+        :param offset: the index of the first doc of the page
+        :returns: the request url
+        """
+        return "%s?%s=%s&fields=%s&offset=%d&limit=%d" % (self.API_URL, param, value,
+                                                         ','.join(fields), offset, self.PAGE_SIZE)
+
+    def iter_pages(self, param, value, fields, prefetch=False):
+        """Yields the docs of a search one page at a time.
+
+        Pages are fetched only as the consumer asks for them and the search
+        stops at the last page or when the consumer stops iterating. With
+        prefetch the next page is fetched on a background thread while the
+        current one is consumed. A failed first page reads as no results,
+        but a later page failing raises, so a partial result is never taken
+        for a whole one.
+        
+        :param param: the search parameter, 'q' for titles or 'author'
+        :param value: the searched title or author
+        :param fields: the doc fields to request and keep
+        :param prefetch: True to fetch the next page in the background
+        :returns: a generator of BookRecord lists
+        :raises IncompleteSearchError: if a page after the first cannot be fetched
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        next_page = None
+        offset = 0
+        json_data = self.make_request(self.search_url(param, value, fields), fields)
+        try:
+            while True:
+                docs = project_docs(json_data, fields)
+                offset += len(docs)
+                total = json_data.get('numFound') if json_data else None
+                more = len(docs) >= self.PAGE_SIZE and (total is None or offset < total)
+                if more and executor:
+                    next_page = executor.submit(self.make_request,
+                                                self.search_url(param, value, fields, offset), fields)
+                if docs:
+                    yield docs
+                if not more:
+                    return
+                if next_page:
+                    json_data = next_page.result()
+                else:
+                    json_data = self.make_request(self.search_url(param, value, fields, offset),
+                                                  fields)
+                if json_data is None:
+                    raise IncompleteSearchError("page at offset %d of %s=%s failed"
+                                                % (offset, param, value))
+        finally:
+            if executor:
+                if next_page:
+                    next_page.cancel()
+                executor.shutdown(wait=False)
+
+    def iter_books_by_author(self, author, prefetch=False):
+        """Yields the books written by a given author, across every result page.
+        
+        :param author: the name of the author
+        :param prefetch: True to fetch the next page in the background
+        :returns: a generator of book titles
+        """
+        for docs in self.iter_pages('author', author, self.AUTHOR_FIELDS, prefetch):
+            yield from titles_from_docs(docs)
+
+    def iter_book_info(self, book, prefetch=False):
+        """Yields the information for a given book, across every result page.
+        
+        :param book: the title of the book
+        :param prefetch: True to fetch the next page in the background
+        :returns: a generator of dictionaries with book data
+        """
+        for docs in self.iter_pages('q', book, self.TITLE_FIELDS, prefetch):
+            yield from book_info_from_docs(docs)
+
+    def iter_ebooks(self, book, prefetch=False):
+        """Yields the ebooks for a given book, across every result page.
+        
+        :param book: the title of the book
+        :param prefetch: True to fetch the next page in the background
+        :returns: a generator of data about the ebooks
+        """
+        for docs in self.iter_pages('q', book, self.TITLE_FIELDS, prefetch):
+            yield from ebooks_from_docs(docs)
 
     def is_book_available(self, book):
         """Determines if a given book is available to borrow.
+
+        A book found in the local index needs no request; a book missing
+        from it is searched remotely unless the index is complete.
         
         :param book: the title of the book
         :returns: True if available, False if not
         """
-        request_url = "%s?q=%s" % (self.API_URL, book)
-        json_data = self.make_request(request_url)
-        if json_data and len(json_data['docs']) >= 1:
-            return True
-        return False
+        found = self.indexed_availability(book)
+        if found is not None:
+            return found
+        request_url = self.search_url('q', book, self.TITLE_FIELDS)
+        return has_docs(self.make_request(request_url, self.TITLE_FIELDS))
+
+    def indexed_availability(self, book):
+        """Answers whether a book is available from the local index alone.
+        
+        :param book: the title of the book
+        :returns: True if indexed, False if not and the index is complete, None if the index cannot tell
+        """
+        if self.index is None:
+            return None
+        found = self.index.contains_title(book)
+        if found or self.index.complete:
+            return found
+        return None
 
     def books_by_author(self, author):
         """Gets all the books written by a given author.
         
         :param author: the name of the author
-        :returns: the titles of all the books in a list form
+        :returns: the titles of all the books as a SearchResult
         """
-        request_url = "%s?author=%s" % (self.API_URL, author)
-        json_data = self.make_request(request_url)
-        if not json_data:
-            return []
-        books = []
-        for book in json_data['docs']:
-            books.append(book['title_suggest'])
-        return books
+        result = SearchResult()
+        for docs in self.iter_pages('author', author, self.AUTHOR_FIELDS):
+            result.add_titles(docs)
+        return result
 
     def get_book_info(self, book):
         """Gets the information for a given book.
@@ -57,34 +338,132 @@ class Books_API:
         :param book: the title of the book
         :returns: a list of dictionaries with book data
         """
-        request_url = "%s?q=%s" % (self.API_URL, book)
-        json_data = self.make_request(request_url)
-        if not json_data:
-            return []
-        books_info = []
-        for book in json_data['docs']:
-            info = {'title': book['title']}
-            if 'publisher' in book:
-                info.update({'publisher': book['publisher']})
-            if 'publish_year' in book:
-                info.update({'publish_year': book['publish_year']})
-            if 'language' in book:
-                info.update({'language': book['language']})
-            books_info.append(info)
-        return books_info
+        return list(self.iter_book_info(book))
+
+    def get_book_summary(self, book):
+        """Gets whether a book is available and an ebook, its ebook count and languages.
+
+        All four come from one title search, read in a single pass, where
+        is_book_available, get_ebooks and get_book_info each read it again.
+        Availability is taken from the local index when it can tell, as
+        is_book_available does.
+        
+        :param book: the title of the book
+        :returns: a BookSummary
+        """
+        summary = summary_from_docs(book, self.iter_pages('q', book, self.TITLE_FIELDS))
+        found = self.indexed_availability(book)
+        if found is not None:
+            summary = summary._replace(available=found)
+        return summary
 
     def get_ebooks(self, book):
         """Gets the ebooks for a given book.
         
         :param book: the title of the book
-        :returns: data about the ebooks
-        """
-        request_url = "%s?q=%s" % (self.API_URL, book)
-        json_data = self.make_request(request_url)
-        if not json_data:
-            return []
-        ebooks = []
-        for book in json_data['docs']:
-            if book['ebook_count_i'] >= 1:
-                ebooks.append({'title': book['title'], 'ebook_count': book['ebook_count_i']})
-        return ebooks
+        :returns: data about the ebooks as a SearchResult
+        """
+        result = SearchResult()
+        for docs in self.iter_pages('q', book, self.TITLE_FIELDS):
+            result.add_ebooks(docs)
+        return result
+
+def summary_from_docs(book, pages):
+    """Summarizes the docs of a title search in one pass.
+
+    :param book: the searched title
+    :param pages: an iterable of BookRecord pages
+    :returns: a BookSummary
+    """
+    title = normalize_title(book)
+    available = is_ebook = False
+    ebook_count = 0
+    languages = set()
+    for docs in pages:
+        available = available or bool(docs)
+        for doc, normalized in zip(docs, normalized_titles(docs, 'title')):
+            count = doc.ebook_count_i or 0
+            if count >= 1:
+                ebook_count += count
+                is_ebook = is_ebook or normalized == title
+            if doc.language is not None:
+                languages.update(doc.language)
+    return BookSummary(available, is_ebook, ebook_count, languages)
+
+def project_docs(json_data, fields):
+    """Gets the docs of a search response as BookRecords holding only the given fields.
+
+    Docs that are already BookRecords are kept as they are, and a BookPage
+    is returned itself so that its normalized titles are kept too.
+
+    :param json_data: the JSON body of a search, or None
+    :param fields: the doc fields to keep
+    :returns: a BookPage of BookRecords
+    """
+    if not json_data:
+        return BookPage()
+    if isinstance(json_data['docs'], BookPage):
+        return json_data['docs']
+    records = []
+    for doc in json_data['docs']:
+        if not isinstance(doc, BookRecord):
+            doc = BookRecord(**{field: doc.get(field) for field in fields})
+        records.append(doc)
+    return BookPage(records)
+
+def project_response(json_data, fields):
+    """Replaces the docs of a search response with BookRecords.
+
+    :param json_data: the JSON body of a search
+    :param fields: the doc fields to keep
+    :returns: a dictionary with the numFound count and the projected docs
+    """
+    return {'numFound': json_data.get('numFound'), 'docs': project_docs(json_data, fields)}
+
+def has_docs(json_data):
+    """Determines if a search response found at least one book.
+
+    :param json_data: the JSON body of a search, or None
+    :returns: True if there is at least one doc, False if not
+    """
+    if json_data and len(json_data['docs']) >= 1:
+        return True
+    return False
+
+def titles_from_docs(docs):
+    """Gets the suggested titles from search docs.
+
+    :param docs: the BookRecords of a search
+    :returns: the titles of all the books in a list form
+    """
+    return [book.title_suggest for book in docs]
+
+def book_info_from_docs(docs):
+    """Gets the title, publisher, publish year and language from search docs.
+
+    :param docs: the BookRecords of a search
+    :returns: a list of dictionaries with book data
+    """
+    books_info = []
+    for book in docs:
+        info = {'title': book.title}
+        if book.publisher is not None:
+            info.update({'publisher': book.publisher})
+        if book.publish_year is not None:
+            info.update({'publish_year': book.publish_year})
+        if book.language is not None:
+            info.update({'language': book.language})
+        books_info.append(info)
+    return books_info
+
+def ebooks_from_docs(docs):
+    """Gets the books that have ebooks from search docs.
+
+    :param docs: the BookRecords of a search
+    :returns: data about the ebooks
+    """
+    ebooks = []
+    for book in docs:
+        if (book.ebook_count_i or 0) >= 1:
+            ebooks.append({'title': book.title, 'ebook_count': book.ebook_count_i})
+    return ebooks
@@ -5,15 +5,25 @@ Description: Library class used for SWEN-352 mocking activity.
 
 from library.patron import Patron
 from library.library_db_interface import Library_DB
-from library.ext_api_interface import Books_API
+from library.ext_api_interface import Books_API, BookSummary
+from library.borrow_index import BorrowIndex
+from library.search_result import SearchResult
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 class Library:
     """Class used to represent a library."""
 
-    def __init__(self):
-        """Constructor for the Library class."""
-        self.db = Library_DB()
+    def __init__(self, max_workers=8, db=None):
+        """Constructor for the Library class.
+        
+        :param max_workers: the number of threads used by the batch lookup methods
+        :param db: the Library_DB to use, a TinyDB backed one by default
+        """
+        self.db = db or Library_DB()
         self.api = Books_API()
+        self.max_workers = max_workers
+        self.borrow_index = None
 
     ############################################################################
     ################################ API METHODS ###############################
@@ -25,12 +35,8 @@ class Library:
         :param book: the title of the book
         :returns: True if yes, False if not
         """
-        ebooks = self.api.get_ebooks(book)
-        book = book.lower()
-        for ebook in ebooks:
-            if book == ebook['title'].lower():
-                return True
-        return False
+        ebooks = SearchResult.of(self.api.get_ebooks(book))
+        return ebooks.has_title(book)
 
     def get_ebooks_count(self, book):
         """Gets the number of ebooks for a given book.
@@ -38,11 +44,8 @@ class Library:
         :param book: the title of the book
         :returns: the number of ebooks
         """
-        ebooks = self.api.get_ebooks(book)
-        ebook_count = 0
-        for ebook in ebooks:
-            ebook_count += ebook['ebook_count']
-        return ebook_count
+        ebooks = SearchResult.of(self.api.get_ebooks(book))
+        return ebooks.ebook_count()
 
     def is_book_by_author(self, author, book):
         """Determines if the book was written by a given author.
@@ -51,11 +54,13 @@ class Library:
         :param book: the name of the book
         :returns: True if the book was written by the author, False if not
         """
-        results = self.api.books_by_author(author)
-        for result in results:
-            if book.lower() == result.lower():
-                return True
-        return False
+        index = self.api.index
+        if index is not None:
+            found = index.has_book_by_author(author, book)
+            if found or index.complete:
+                return found
+        results = SearchResult.of(self.api.books_by_author(author))
+        return results.has_title(book)
 
     def get_languages_for_book(self, book):
         """Get the available languages for a given book.
@@ -70,6 +75,74 @@ class Library:
                 lang_set.update(book['language'])
         return lang_set
 
+    def get_book_summary(self, book):
+        """Gets whether a book is available and an e-book, its ebook count and languages.
+
+        The answers match is_book_available, is_ebook, get_ebooks_count and
+        get_languages_for_book, but come from one search read once.
+        
+        :param book: the title of the book
+        :returns: a BookSummary with available, is_ebook, ebook_count and languages
+        """
+        return self.api.get_book_summary(book)
+
+    ############################################################################
+    ############################# BATCH API METHODS ############################
+    ############################################################################
+
+    def is_ebook_many(self, books):
+        """Checks which of the books are e-books.
+        
+        :param books: the titles of the books
+        :returns: a list of True/False in the order of books, None where the lookup failed
+        """
+        return self.run_batch(self.is_ebook, books)
+
+    def get_ebooks_count_many(self, books):
+        """Gets the number of ebooks for each of the books.
+        
+        :param books: the titles of the books
+        :returns: a list of counts in the order of books, None where the lookup failed
+        """
+        return self.run_batch(self.get_ebooks_count, books)
+
+    def get_languages_for_books(self, books):
+        """Gets the available languages for each of the books.
+        
+        :param books: the titles of the books
+        :returns: a list of language sets in the order of books, None where the lookup failed
+        """
+        return self.run_batch(self.get_languages_for_book, books)
+
+    def get_book_summaries(self, books):
+        """Gets the summary of each of the books.
+        
+        :param books: the titles of the books
+        :returns: a list of BookSummaries in the order of books, None where the lookup failed
+        """
+        return self.run_batch(self.get_book_summary, books)
+
+    def run_batch(self, lookup, books):
+        """Runs a single-book lookup for many books on a thread pool.
+
+        Each distinct title is looked up once, however often it is repeated.
+        A lookup that raises only loses its own result.
+        
+        :param lookup: the method taking one title
+        :param books: the titles of the books
+        :returns: a list of results in the order of books, None where the lookup failed
+        """
+        unique_books = list(dict.fromkeys(books))
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {book: executor.submit(lookup, book) for book in unique_books}
+            for book, future in futures.items():
+                try:
+                    results[book] = future.result()
+                except Exception:
+                    results[book] = None
+        return [results[book] for book in books]
+
     ############################################################################
     ################################# DB METHODS ###############################
     ############################################################################
@@ -105,6 +178,8 @@ class Library:
         """
         patron.add_borrowed_book(book.lower())
         self.db.update_patron(patron)
+        if self.borrow_index is not None:
+            self.borrow_index.add(book, patron.get_memberID())
 
     def return_borrowed_book(self, book, patron):
         """Returns a borrowed book for a Patron.
@@ -114,6 +189,60 @@ class Library:
         """
         patron.return_borrowed_book(book.lower())
         self.db.update_patron(patron)
+        if self.borrow_index is not None:
+            self.borrow_index.remove(book, patron.get_memberID())
+
+    @contextmanager
+    def checkout_session(self, patron):
+        """Groups the loans and returns of a Patron into a single database write.
+
+        Inside the with block books are borrowed and returned on the Patron
+        it yields, in memory only. When the block ends the Patron is written
+        once, if anything changed. If the block raises or the write fails,
+        the Patron's borrowed books are put back as they were and nothing is
+        written.
+
+        :param patron: the Patron object
+        """
+        before = list(patron.get_borrowed_books())
+        try:
+            yield patron
+            after = patron.get_borrowed_books()
+            if after != before:
+                self.db.update_patron(patron)
+        except BaseException:
+            patron.borrowed_books = before
+            raise
+        if self.borrow_index is not None:
+            memberID = patron.get_memberID()
+            for book in set(after).difference(before):
+                self.borrow_index.add(book, memberID)
+            for book in set(before).difference(after):
+                self.borrow_index.remove(book, memberID)
+
+    def borrow_books(self, books, patron):
+        """Borrows several books for a Patron with a single database write.
+
+        If the write fails, none of the books are borrowed.
+        
+        :param books: the titles of the books
+        :param patron: the Patron object
+        """
+        with self.checkout_session(patron):
+            for book in books:
+                patron.add_borrowed_book(book)
+
+    def return_books(self, books, patron):
+        """Returns several borrowed books for a Patron with a single database write.
+
+        If the write fails, none of the books are returned.
+        
+        :param books: the titles of the books
+        :param patron: the Patron object
+        """
+        with self.checkout_session(patron):
+            for book in books:
+                patron.return_borrowed_book(book)
 
     def is_book_borrowed(self, book, patron):
         """Determines if the Patron has borrowed a given book.
@@ -122,5 +251,35 @@ class Library:
         :param patron: the Patron object
         :returns: True if the Patron has borrowed the book, False if not
         """
-        borrowed_books = patron.get_borrowed_books()
-        return book.lower() in borrowed_books
+        return patron.has_borrowed_book(book)
+
+    def build_borrow_index(self):
+        """Builds the index of borrowed books in one pass over the database.
+
+        The index is built on the first borrowers query and then kept up to
+        date by borrow_book and return_borrowed_book. Call this again after
+        changing borrowed books without going through the Library.
+        """
+        borrow_index = BorrowIndex()
+        borrow_index.build(self.db.iter_patrons())
+        self.borrow_index = borrow_index
+
+    def get_borrowers(self, book):
+        """Gets the Patrons who currently have a book.
+        
+        :param book: the title of the book
+        :returns: a frozenset of the memberIDs of the Patrons
+        """
+        if self.borrow_index is None:
+            self.build_borrow_index()
+        return self.borrow_index.borrowers(book)
+
+    def count_borrowed(self, book):
+        """Gets the number of copies of a book that are currently borrowed.
+        
+        :param book: the title of the book
+        :returns: the number of Patrons who have the book
+        """
+        if self.borrow_index is None:
+            self.build_borrow_index()
+        return self.borrow_index.count(book)
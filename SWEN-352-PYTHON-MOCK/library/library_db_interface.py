@@ -3,18 +3,43 @@ Filename: library_db_interface.py
 Description: module used for interacting with the local database
 """
 
-from library.patron import Patron
-from tinydb import TinyDB, Query
+from library.patron import Patron, PatronView
+from library.tinydb_backend import TinyDBBackend
+from itertools import islice
 import os
 
 class Library_DB:
-    """Class for the local library database."""
+    """Class for the local library database.
+
+    Patron records are kept by a storage backend: TinyDBBackend on
+    DATABASE_FILE by default, or any object with the same methods, such as
+    SQLiteBackend.
+    """
 
     DATABASE_FILE = 'db.json'
 
-    def __init__(self):
-        """Constructor for the Library_DB object."""
-        self.db = TinyDB(self.DATABASE_FILE)
+    def __init__(self, path=None, write_behind=False, flush_every=1000, flush_interval=5,
+                 fsync=False, shared=False, backend=None):
+        """Constructor for the Library_DB object.
+
+        By default every change is written to the file straight away. With
+        write_behind, changes are buffered in memory and written out every
+        flush_every changes or flush_interval seconds, and on close_db. The
+        interval is only checked when a change is made, so call flush to
+        write out changes left buffered while the database sits idle.
+        
+        :param path: the path of the database file, DATABASE_FILE if None
+        :param write_behind: True to buffer changes and write them in batches
+        :param flush_every: the number of buffered changes that triggers a write
+        :param flush_interval: the number of seconds after which buffered changes are written
+        :param fsync: True to fsync the file after every write
+        :param shared: True if other Library_DBs or processes use the file at the same time, see TinyDBBackend
+        :param backend: the storage backend to use instead of a TinyDBBackend on path
+        """
+        if backend is None:
+            backend = TinyDBBackend(path or self.DATABASE_FILE, write_behind, flush_every,
+                                    flush_interval, fsync, shared)
+        self.db = backend
 
     def insert_patron(self, patron):
         """Inserts a Patron into the database.
@@ -24,28 +49,82 @@ class Library_DB:
         """
         if not patron:
             return None
-        if self.retrieve_patron(patron.get_memberID()): # patron already in db
+        if self.db.contains(patron.get_memberID()): # patron already in db
             return None
         data = self.convert_patron_to_db_format(patron)
         id = self.db.insert(data)
         return id
 
+    def insert_patrons(self, patrons):
+        """Inserts many Patrons into the database in one write.
+
+        Patrons already in the database, or repeated earlier in patrons, are
+        skipped, as insert_patron would skip them.
+        
+        :param patrons: an iterable of Patron objects
+        :returns: a list with the ID of each inserted Patron, or None for each skipped one
+        """
+        ids = []
+        positions = []
+        records = []
+        seen = set()
+        for patron in patrons:
+            ids.append(None)
+            if not patron:
+                continue
+            memberID = patron.get_memberID()
+            if memberID in seen or self.db.contains(memberID):
+                continue
+            seen.add(memberID)
+            positions.append(len(ids) - 1)
+            records.append(self.convert_patron_to_db_format(patron))
+        if records:
+            with self.db.transaction():
+                for position, id in zip(positions, self.db.insert_many(records)):
+                    ids[position] = id
+        return ids
+
     def get_patron_count(self):
         """Gets the number of Patrons in the database.
         
         :returns: the total number of Patrons in the DB
         """
-        results = self.db.all()
-        return len(results)
+        return self.db.count()
 
-    def get_all_patrons(self):
+    def get_all_patrons(self, views=False):
         """Gets a list of all the Patrons in the database.
         
+        :param views: True to get PatronViews instead of Patron documents
         :returns: a list of all the Patrons
         """
-        results = self.db.all()
+        if views:
+            return list(self.iter_patrons(views))
+        results = list(self.db)
         return results
 
+    def iter_patrons(self, views=False):
+        """Yields the Patrons in the database one at a time.
+        
+        :param views: True to yield PatronViews instead of Patron documents
+        :returns: a generator of Patron documents
+        """
+        if views:
+            for doc in self.db:
+                yield PatronView(doc)
+            return
+        for doc in self.db:
+            yield doc
+
+    def get_patrons(self, offset=0, limit=None):
+        """Gets one page of the Patrons in the database.
+        
+        :param offset: the number of Patrons to skip
+        :param limit: the maximum number of Patrons to return, None for no limit
+        :returns: a list of Patron documents
+        """
+        stop = None if limit is None else offset + limit
+        return list(islice(self.iter_patrons(), offset, stop))
+
     def update_patron(self, patron):
         """Updates a Patron's data in the DB.
         
@@ -54,9 +133,8 @@ class Library_DB:
         """
         if not patron:
             return None
-        query = Query()
         data = self.convert_patron_to_db_format(patron)
-        self.db.update(data, query.memberID == patron.get_memberID())
+        self.db.update(data)
 
     def retrieve_patron(self, memberID):
         """Gets a Patron from the database.
@@ -64,23 +142,43 @@ class Library_DB:
         :param memberID: the ID for the Patron to retrieve
         :returns: the Patron with the given ID, or None
         """
-        query = Query()
-        # assuming no two people in the db have the same memberID
-        results = self.db.search(query.memberID == memberID)
-        if results:
-            return Patron(results[0]['fname'], results[0]['lname'], results[0]['age'],
-            results[0]['memberID'])
+        result = self.db.get(memberID)
+        if result:
+            return Patron.from_record(result)
         return None
 
+    def delete_patron(self, memberID):
+        """Deletes a Patron from the database.
+        
+        :param memberID: the ID for the Patron to delete
+        :returns: True if the Patron was deleted, False if not in the database
+        """
+        return self.db.remove(memberID)
+
+    def transaction(self):
+        """Groups the changes made in a with block into a single write.
+
+        If the block raises, its changes are dropped and the database is left
+        as it was before the block. Nested transactions join the outer one.
+        """
+        return self.db.transaction()
+
+    def flush(self):
+        """Writes any buffered changes to the database file."""
+        self.db.flush()
+
     def close_db(self):
-        """Closes the database."""
+        """Closes the database, writing any buffered changes first."""
         self.db.close()
 
     def convert_patron_to_db_format(self, patron):
         """Converts the Patron object to a dictionary format.
+
+        The borrowed books are copied, so later changes to the Patron do not
+        reach a record the database keeps in memory.
         
         :param patron: the Patron python object
         :returns: a dictionary of the Patron's data
         """
         return {'fname': patron.get_fname(), 'lname': patron.get_lname(), 'age': patron.get_age(), 'memberID': patron.get_memberID(),
-        'borrowed_books': patron.get_borrowed_books()}
+        'borrowed_books': list(patron.get_borrowed_books())}
@@ -0,0 +1,295 @@
+"""
+Filename: log_backend.py
+Description: patron storage backend on an append-only operation log
+"""
+
+import json
+import os
+import shutil
+import threading
+import zlib
+from contextlib import contextmanager
+
+class LogBackend:
+    """Stores patron records as an append-only log of operations.
+
+    Every insert, update and remove appends one line to the log, so a
+    change costs a small sequential write instead of a rewrite of the
+    whole database. The log is replayed into memory when the backend is
+    opened. Once compact_every operations have been appended, a background
+    thread writes the live records to a snapshot file and the log starts
+    over, so replay time stays bounded.
+
+    Each log line is "<crc32> <json>". A line that is cut short or fails
+    its checksum marks the end of the log: it and anything after it are
+    truncated away when the log is opened, which is what a crash in the
+    middle of an append leaves behind.
+    """
+
+    PUT = 'p'
+    DELETE = 'd'
+
+    def __init__(self, path, fsync=False, compact_every=100000):
+        """Constructor for the LogBackend class.
+
+        :param path: the path of the log file, the snapshot is kept next to it
+        :param fsync: True to fsync the log after every append
+        :param compact_every: the number of appended operations that triggers a compaction, None to never compact on its own
+        """
+        self.path = path
+        self.snapshot_path = path + '.snapshot'
+        self.compacting_path = path + '.compacting'
+        self.fsync = fsync
+        self.compact_every = compact_every
+        self.lock = threading.RLock()
+        self.records = {}
+        self.appended = 0
+        self.seq = 0
+        self.depth = 0
+        self.pending = []
+        self.undo = []
+        self.compactor = None
+        self.load(self.snapshot_path)
+        interrupted = os.path.exists(self.compacting_path)
+        if interrupted:
+            self.load(self.compacting_path)
+        self.appended = self.load(self.path)
+        if interrupted:
+            # the snapshot may be missing the set aside log, so write a
+            # complete one before starting the log over
+            self.write_snapshot(list(self.records.values()))
+            open(self.path, 'wb').close()
+            self.appended = 0
+        self.log = open(self.path, 'ab')
+
+    def load(self, path):
+        """Replays the operations of a log or snapshot file into memory.
+
+        The file is truncated at the first incomplete or corrupt line.
+
+        :param path: the path of the file
+        :returns: the number of operations replayed
+        """
+        if not os.path.exists(path):
+            return 0
+        count = 0
+        offset = 0
+        with open(path, 'rb+') as f:
+            for line in f:
+                op = self.decode(line)
+                if op is None:
+                    f.truncate(offset)
+                    break
+                self.apply(op)
+                offset += len(line)
+                count += 1
+        return count
+
+    def encode(self, op):
+        """Encodes an operation as a checksummed log line."""
+        payload = json.dumps(op, separators=(',', ':')).encode('utf-8')
+        return b'%08x %s\n' % (zlib.crc32(payload), payload)
+
+    def decode(self, line):
+        """Decodes a log line, None if it is torn or corrupt."""
+        if not line.endswith(b'\n') or len(line) < 10:
+            return None
+        payload = line[9:-1]
+        try:
+            if int(line[:8], 16) != zlib.crc32(payload):
+                return None
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    def apply(self, op):
+        """Applies a decoded operation to the in-memory records."""
+        if op[0] == self.PUT:
+            self.records[op[1]['memberID']] = op[1]
+        else:
+            self.records.pop(op[1], None)
+
+    def append(self, op):
+        """Applies an operation and appends it to the log.
+
+        Inside a transaction the line is held back until the commit, and
+        the previous value is kept so that a rollback can restore it.
+        """
+        with self.lock:
+            memberID = op[1]['memberID'] if op[0] == self.PUT else op[1]
+            if self.depth:
+                self.undo.append((memberID, self.records.get(memberID)))
+            self.apply(op)
+            self.seq += 1
+            self.pending.append(self.encode(op))
+            if not self.depth:
+                self.write_pending()
+            return self.seq
+
+    def write_pending(self):
+        """Writes the held back log lines in one append."""
+        if not self.pending:
+            return
+        self.log.write(b''.join(self.pending))
+        self.log.flush()
+        if self.fsync:
+            os.fsync(self.log.fileno())
+        self.appended += len(self.pending)
+        self.pending = []
+        if self.compact_every is not None and self.appended >= self.compact_every:
+            self.compact()
+
+    def __iter__(self):
+        with self.lock:
+            records = list(self.records.values())
+        for record in records:
+            yield self.copy(record)
+
+    def count(self):
+        """Gets the number of records.
+
+        :returns: the number of records
+        """
+        return len(self.records)
+
+    def contains(self, memberID):
+        """Determines if a record is stored for the memberID.
+
+        :param memberID: the ID of the Patron
+        :returns: True if stored, False if not
+        """
+        return memberID in self.records
+
+    def copy(self, record):
+        """Copies a record so later changes to the caller's lists are not stored."""
+        return dict(record, borrowed_books=list(record['borrowed_books']))
+
+    def insert(self, record):
+        """Inserts a record, which must not be stored yet.
+
+        :param record: the Patron record
+        :returns: the sequence number of the log operation
+        """
+        return self.append([self.PUT, self.copy(record)])
+
+    def insert_many(self, records):
+        """Inserts records, none of which may be stored yet, in one append.
+
+        :param records: a list of Patron records
+        :returns: the list of sequence numbers of the log operations
+        """
+        with self.transaction():
+            return [self.insert(record) for record in records]
+
+    def get(self, memberID):
+        """Gets the record for the memberID.
+
+        :param memberID: the ID of the Patron
+        :returns: the record, None if not stored
+        """
+        record = self.records.get(memberID)
+        return self.copy(record) if record else None
+
+    def update(self, record):
+        """Replaces the stored record with the same memberID.
+
+        :param record: the Patron record
+        :returns: True if updated, False if not stored
+        """
+        with self.lock:
+            if record['memberID'] not in self.records:
+                return False
+            self.append([self.PUT, self.copy(record)])
+            return True
+
+    def remove(self, memberID):
+        """Removes the record for the memberID.
+
+        :param memberID: the ID of the Patron
+        :returns: True if removed, False if not stored
+        """
+        with self.lock:
+            if memberID not in self.records:
+                return False
+            self.append([self.DELETE, memberID])
+            return True
+
+    @contextmanager
+    def transaction(self):
+        """Groups the changes made in a with block into a single append.
+
+        If the block raises, its changes are undone in memory and never
+        reach the log. Nested transactions join the outer one. Other
+        threads wait until the transaction ends.
+        """
+        with self.lock:
+            self.depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    for memberID, record in reversed(self.undo):
+                        if record is None:
+                            self.records.pop(memberID, None)
+                        else:
+                            self.records[memberID] = record
+                    self.undo = []
+                    self.pending = []
+                raise
+            self.depth -= 1
+            if self.depth == 0:
+                self.undo = []
+                self.write_pending()
+
+    def compact(self, wait=False):
+        """Writes the live records to the snapshot and starts a new log.
+
+        The current log is set aside and a new one opened straight away, so
+        appends carry on while the snapshot is written by a background
+        thread. The old log is deleted once the snapshot is in place. If
+        a compaction is already running, this does nothing.
+
+        :param wait: True to wait for the snapshot to be written
+        """
+        with self.lock:
+            if self.compactor is not None and self.compactor.is_alive():
+                return
+            records = list(self.records.values())
+            self.log.close()
+            if os.path.exists(self.compacting_path):
+                # left by a failed snapshot, keep its operations with the new ones
+                with open(self.compacting_path, 'ab') as dst, open(self.path, 'rb') as src:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.compacting_path)
+            self.log = open(self.path, 'ab')
+            self.appended = 0
+            self.compactor = threading.Thread(target=self.write_snapshot, args=(records,),
+                                              daemon=True)
+            self.compactor.start()
+        if wait:
+            self.compactor.join()
+
+    def write_snapshot(self, records):
+        """Atomically replaces the snapshot with the given records."""
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for record in records:
+                f.write(self.encode([self.PUT, record]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        os.remove(self.compacting_path)
+
+    def flush(self):
+        """Does nothing, changes are appended as they are made."""
+        pass
+
+    def close(self):
+        """Waits for a running compaction and closes the log."""
+        if self.compactor is not None:
+            self.compactor.join()
+        with self.lock:
+            self.log.close()
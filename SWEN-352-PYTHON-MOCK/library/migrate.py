@@ -0,0 +1,109 @@
+"""
+Filename: migrate.py
+Description: copies patron records from one storage backend to another
+"""
+
+import os
+import shutil
+import sys
+from library.tinydb_backend import TinyDBBackend
+from library.sqlite_backend import SQLiteBackend
+from library.sharded_backend import ShardedBackend
+
+def migrate(source, target):
+    """Copies every record of the source backend into the target backend.
+
+    The copy runs as one transaction on the target, so it either takes
+    every record or none. Records already in the target are replaced.
+
+    :param source: the backend to read from
+    :param target: the backend to write to
+    :returns: the number of records copied
+    """
+    copied = 0
+    with target.transaction():
+        for record in source:
+            if not target.update(record):
+                target.insert(record)
+            copied += 1
+    return copied
+
+def reshard_paths(directory):
+    """Gets the paths reshard keeps the new and the old shards at.
+
+    :param directory: the directory of the sharded database
+    :returns: the new and the old directory
+    """
+    directory = directory.rstrip(os.sep)
+    return directory + '.reshard', directory + '.old'
+
+def recover_reshard(directory):
+    """Finishes or undoes a reshard that was interrupted.
+
+    While the records are copied the old directory is untouched, so the
+    new shards are dropped. Once the copy is done the directory is swapped
+    for the new shards; if it is missing, the swap is finished. Left over
+    old shards are then removed. Nothing else may use the database while
+    this runs.
+
+    :param directory: the directory of the sharded database
+    """
+    new_directory, old_directory = reshard_paths(directory)
+    if not os.path.exists(directory):
+        if os.path.exists(new_directory):
+            os.replace(new_directory, directory)
+        elif os.path.exists(old_directory):
+            os.replace(old_directory, directory)
+    shutil.rmtree(new_directory, ignore_errors=True)
+    shutil.rmtree(old_directory, ignore_errors=True)
+
+def reshard(directory, shards, **options):
+    """Rebalances a sharded database over a new number of shards.
+
+    The patrons are copied into new shards next to the directory, which
+    then takes the place of the old one. Nothing else may use the
+    database while this runs. If a previous reshard was interrupted, it
+    is recovered first; see recover_reshard, which should also be run
+    before a database is opened after a crash in the middle of a reshard.
+
+    :param directory: the directory of the sharded database
+    :param shards: the new number of shards
+    :param options: the other ShardedBackend arguments the database is opened with
+    :returns: the number of records moved
+    """
+    recover_reshard(directory)
+    new_directory, old_directory = reshard_paths(directory)
+    source = ShardedBackend(directory, **options)
+    target = ShardedBackend(new_directory, shards, **options)
+    try:
+        copied = migrate(source, target)
+    finally:
+        source.close()
+        target.close()
+    os.replace(directory, old_directory)
+    os.replace(new_directory, directory)
+    shutil.rmtree(old_directory)
+    return copied
+
+def main(argv):
+    """Imports a TinyDB file into a SQLite database, or reshards a sharded one.
+
+    Usage: python -m library.migrate db.json db.sqlite3 | reshard DIRECTORY SHARDS
+    """
+    if len(argv) == 4 and argv[1] == 'reshard':
+        print("moved %d patrons" % reshard(argv[2], int(argv[3])))
+        return 0
+    if len(argv) != 3:
+        print(main.__doc__.strip().splitlines()[-1])
+        return 2
+    source = TinyDBBackend(argv[1])
+    target = SQLiteBackend(argv[2])
+    try:
+        print("copied %d patrons" % migrate(source, target))
+    finally:
+        source.close()
+        target.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
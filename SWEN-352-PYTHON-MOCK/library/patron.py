@@ -4,13 +4,29 @@ Description: Patron class for SWEN-352 mocking activity.
 """
 
 import re
+import sys
+from bisect import bisect_right
+
+DIGIT = re.compile(r'\d')
+
+def intern(name):
+    """Interns a name so that Patrons with the same name share one string."""
+    return sys.intern(name) if type(name) is str else name
 
 class InvalidNameException(Exception):
     """Custom Exception for an invalid name."""
     pass
 
 class Patron:
-    """Patron class used to represent a user for a library."""
+    """Patron class used to represent a user for a library.
+
+    Patrons use __slots__ and interned names so that millions of them fit
+    in memory, and keep their borrowed books as the keys of a dictionary,
+    an insertion-ordered set, so adding, returning and checking a book do
+    not scan the loans.
+    """
+
+    __slots__ = ('fname', 'lname', 'age', 'memberID', '_borrowed')
 
     def  __init__(self, fname, lname, age, memberID):
         """Constructor for the Patron class.
@@ -21,43 +37,157 @@ class Patron:
         :param memberID: the ID for the Patron in the library's system
         """
 
-        if re.search('\d', fname) or re.search('\d', lname):
+        if DIGIT.search(fname) or DIGIT.search(lname):
             raise InvalidNameException("Name should not contain numbers")
-        self.fname = fname
-        self.lname = lname
+        self.fname = intern(fname)
+        self.lname = intern(lname)
         self.age = age
         self.memberID = memberID
-        self.borrowed_books = []
+        self._borrowed = {}
+
+    @classmethod
+    def from_record(cls, record):
+        """Builds a Patron from a stored record without validating it again.
+
+        Records only reach the database through a Patron, so their names
+        were already checked. The borrowed books are restored as well.
+
+        :param record: the Patron record, as Library_DB stores it
+        :returns: the Patron
+        """
+        patron = cls.__new__(cls)
+        patron.fname = intern(record['fname'])
+        patron.lname = intern(record['lname'])
+        patron.age = record['age']
+        patron.memberID = record['memberID']
+        patron._borrowed = dict.fromkeys(record.get('borrowed_books', ()))
+        return patron
+
+    @staticmethod
+    def validate_many(records):
+        """Checks the names of many records at once.
+
+        Every name is joined into one string and searched for a digit in a
+        single pass. Only when a digit is found are the records holding
+        one looked up, from the position of the match. Records without an
+        age or a memberID are rejected as well.
+
+        :param records: an iterable of records in the Library_DB record layout
+        :returns: the list of valid records and a list of (position, reason)
+                  tuples for the rejected ones
+        """
+        records = list(records)
+        names = []
+        rejected = {}
+        for position, record in enumerate(records):
+            fname, lname = record.get('fname'), record.get('lname')
+            if type(fname) is not str or type(lname) is not str:
+                rejected[position] = "Name should be text"
+                fname = lname = ''
+            else:
+                missing = [field for field in ('age', 'memberID') if field not in record]
+                if missing:
+                    rejected[position] = "Missing " + ", ".join(missing)
+            names.append(fname)
+            names.append(lname)
+        joined = ''.join(names)
+        match = DIGIT.search(joined)
+        if match:
+            ends = []
+            end = 0
+            for name in names:
+                end += len(name)
+                ends.append(end)
+            while match:
+                position = bisect_right(ends, match.start()) // 2
+                rejected[position] = "Name should not contain numbers"
+                match = DIGIT.search(joined, ends[position * 2 + 1])
+        if not rejected:
+            return records, []
+        valid = [record for position, record in enumerate(records) if position not in rejected]
+        return valid, sorted(rejected.items())
+
+    @classmethod
+    def from_records(cls, records):
+        """Builds many Patrons from records, validating their names in one pass.
+
+        Records with invalid names or missing fields are reported instead of
+        raising, see validate_many.
+
+        :param records: an iterable of records in the Library_DB record layout
+        :returns: the list of Patrons and a list of (position, reason) tuples
+                  for the rejected records
+        """
+        valid, rejected = cls.validate_many(records)
+        return [cls.from_record(record) for record in valid], rejected
+
+    @property
+    def borrowed_books(self):
+        """The list of borrowed books, in the order they were borrowed.
+
+        The list is a new copy on every read, so changing it does not change
+        the Patron: assign a new list, or use add_borrowed_book and
+        return_borrowed_book, instead.
+        """
+        return list(self._borrowed)
+
+    @borrowed_books.setter
+    def borrowed_books(self, books):
+        self._borrowed = dict.fromkeys(books)
+
+    def to_record(self):
+        """Gets the data of the Patron as a dictionary, in the Library_DB record layout.
+
+        :returns: a dictionary of the Patron's data
+        """
+        return {'fname': self.fname, 'lname': self.lname, 'age': self.age,
+                'memberID': self.memberID, 'borrowed_books': list(self._borrowed)}
 
     def add_borrowed_book(self, book):
         """Adds a book to the list of borrowed books for the Patron
         
         :param book: the title of the book
         """
-        book = book.lower()
-        if book in self.borrowed_books:
-            return
-        self.borrowed_books.append(book)
+        self._borrowed[book.lower()] = None
 
     def get_borrowed_books(self):
         """Gets the list of borrowed books for the Patron.
+
+        The list is a copy, so appending to it does not borrow a book; use
+        add_borrowed_book for that.
         
-        :returns: the list of borrowed books
+        :returns: a copy of the list of borrowed books
         """
-        return self.borrowed_books
+        return list(self._borrowed)
+
+    def has_borrowed_book(self, book):
+        """Determines if the Patron has borrowed the book.
+        
+        :param book: the title of the book
+        :returns: True if borrowed, False if not
+        """
+        return book.lower() in self._borrowed
 
     def return_borrowed_book(self, book):
         """Removes the borrowed book from the list of books currently checked out.
         
         :param book: the title of the book to remove
         """
-        book = book.lower()
-        if book in self.borrowed_books:
-            self.borrowed_books.remove(book)
+        self._borrowed.pop(book.lower(), None)
 
     def  __eq__(self, other):
-        """Equals function for the Patron class."""
-        return self.__dict__ == other.__dict__
+        """Equals function for the Patron class.
+
+        Patrons are equal when their data is, and a Patron also equals any
+        object whose __dict__ holds the same data.
+        """
+        if isinstance(other, Patron):
+            return (self.memberID == other.memberID and self.fname == other.fname
+                    and self.lname == other.lname and self.age == other.age
+                    and list(self._borrowed) == list(other._borrowed))
+        if isinstance(other, PatronView):
+            return other.__eq__(self)
+        return self.to_record() == getattr(other, '__dict__', None)
 
     def __ne__(self, other):
         """Not-equal function for the Patron class."""
@@ -89,4 +219,156 @@ class Patron:
         
         :returns: the memberID of the Patron
         """
-        return self.memberID
\ No newline at end of file
+        return self.memberID
+
+class PatronView:
+    """Patron backed by a stored record, which is only copied when written.
+
+    A view answers the Patron getters and attributes straight from the
+    record, so reading many Patrons costs no copies; only the borrowed
+    books are handed out as a copy, as a Patron's are. The first change
+    through a setter, add_borrowed_book or return_borrowed_book copies the
+    record, and the stored one is never modified. Views can also be read
+    like the record, as view['memberID'].
+    """
+
+    FIELDS = ('fname', 'lname', 'age', 'memberID', 'borrowed_books')
+
+    def __init__(self, record):
+        """Constructor for the PatronView class.
+
+        :param record: the Patron record, as Library_DB stores it
+        """
+        self._record = record
+        self._copied = False
+
+    def _writable(self):
+        """Gets the record, copying it before the first change."""
+        if not self._copied:
+            self._record = dict(self._record, borrowed_books=list(self._record['borrowed_books']))
+            self._copied = True
+        return self._record
+
+    def _field(name):
+        def get(self):
+            return self._record[name]
+        def set(self, value):
+            self._writable()[name] = value
+        return property(get, set)
+
+    fname = _field('fname')
+    lname = _field('lname')
+    age = _field('age')
+    memberID = _field('memberID')
+    del _field
+
+    @property
+    def borrowed_books(self):
+        """A copy of the list of borrowed books, in the order they were borrowed."""
+        return list(self._record['borrowed_books'])
+
+    @borrowed_books.setter
+    def borrowed_books(self, books):
+        self._writable()['borrowed_books'] = list(books)
+
+    def __getitem__(self, key):
+        return self._record[key]
+
+    def __repr__(self):
+        return 'PatronView(%r)' % (self._record,)
+
+    def to_record(self):
+        """Gets the record of the view, including any changes made through it."""
+        return self._record
+
+    def to_patron(self):
+        """Builds a Patron with the data of the view.
+
+        :returns: the Patron
+        """
+        return Patron.from_record(self._record)
+
+    def add_borrowed_book(self, book):
+        """Adds a book to the list of borrowed books for the Patron
+        
+        :param book: the title of the book
+        """
+        book = book.lower()
+        if book in self._record['borrowed_books']:
+            return
+        self._writable()['borrowed_books'].append(book)
+
+    def get_borrowed_books(self):
+        """Gets the list of borrowed books for the Patron.
+
+        The list is a copy, so appending to it does not borrow a book; use
+        add_borrowed_book for that.
+        
+        :returns: a copy of the list of borrowed books
+        """
+        return list(self._record['borrowed_books'])
+
+    def has_borrowed_book(self, book):
+        """Determines if the Patron has borrowed the book.
+        
+        :param book: the title of the book
+        :returns: True if borrowed, False if not
+        """
+        return book.lower() in self._record['borrowed_books']
+
+    def return_borrowed_book(self, book):
+        """Removes the borrowed book from the list of books currently checked out.
+        
+        :param book: the title of the book to remove
+        """
+        book = book.lower()
+        if book in self._record['borrowed_books']:
+            self._writable()['borrowed_books'].remove(book)
+
+    def __eq__(self, other):
+        """Equals function, a view equals a Patron or view with the same data.
+
+        Like a Patron, it also equals a record or an object whose __dict__
+        holds the same data, and is unequal to anything else.
+        """
+        if isinstance(other, PatronView):
+            other = other._record
+        elif isinstance(other, Patron):
+            other = other.to_record()
+        elif not isinstance(other, dict):
+            other = getattr(other, '__dict__', None)
+            if other is None:
+                return False
+        return all(self._record.get(field) == other.get(field) for field in self.FIELDS)
+
+    def __ne__(self, other):
+        """Not-equal function for the PatronView class."""
+        return not self.__eq__(other)
+
+    def get_fname(self):
+        """Getter for the first name of the Patron.
+        
+        :returns: the first name of the Patron
+        """
+        return self._record['fname']
+
+    def get_lname(self):
+        """Getter for the last name of the Patron.
+        
+        :returns: the last name of the Patron
+        """
+        return self._record['lname']
+
+    def get_age(self):
+        """Getter for the age of the Patron.
+        
+        :returns: the age of the Patron
+        """
+        return self._record['age']
+
+    def get_memberID(self):
+        """Getter for the memberID of the Patron.
+        
+        :returns: the memberID of the Patron
+        """
+        return self._record['memberID']
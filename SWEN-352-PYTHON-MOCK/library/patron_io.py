@@ -0,0 +1,176 @@
+"""
+Filename: patron_io.py
+Description: streaming import and export of Patrons as CSV or JSON lines
+"""
+
+import csv
+import json
+from collections import namedtuple
+from library.patron import Patron
+
+FIELDS = ('fname', 'lname', 'age', 'memberID', 'borrowed_books')
+BATCH_SIZE = 50000
+
+Rejection = namedtuple('Rejection', ['line', 'memberID', 'reason'])
+
+def read_csv(path):
+    """Yields the rows of a CSV file with a header line.
+    
+    :param path: the path of the CSV file
+    :returns: a generator of (line number, row dictionary) tuples
+    """
+    with open(path, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+def read_jsonl(path):
+    """Yields the rows of a JSON lines file, None for lines that are not JSON.
+    
+    :param path: the path of the JSON lines file
+    :returns: a generator of (line number, row dictionary) tuples
+    """
+    with open(path, 'r') as f:
+        for line, text in enumerate(f, 1):
+            if not text.strip():
+                continue
+            try:
+                yield line, json.loads(text)
+            except ValueError:
+                yield line, None
+
+def parse_row(row):
+    """Converts an imported row to a Patron record, without checking the names.
+
+    The age must be an integer and the memberID an integer or a string; a
+    memberID made of digits is read as an integer. borrowed_books must be
+    a list of titles or, from CSV, a JSON list of titles.
+    
+    :param row: the row dictionary
+    :returns: the record, in the Library_DB record layout
+    :raises ValueError: if the row is malformed
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Row is not an object")
+    missing = [field for field in FIELDS[:4] if row.get(field) in (None, '')]
+    if missing:
+        raise ValueError("Missing " + ", ".join(missing))
+    try:
+        age = int(row['age'])
+    except (TypeError, ValueError):
+        raise ValueError("Age should be a number")
+    memberID = row['memberID']
+    if isinstance(memberID, bool) or not isinstance(memberID, (int, str)):
+        raise ValueError("MemberID should be a number or a string")
+    if isinstance(memberID, str) and memberID.isdigit():
+        memberID = int(memberID)
+    books = row.get('borrowed_books') or []
+    if isinstance(books, str):
+        books = json.loads(books)
+    if not isinstance(books, list) or not all(isinstance(book, str) for book in books):
+        raise ValueError("Borrowed books should be a list of titles")
+    return {'fname': row['fname'], 'lname': row['lname'], 'age': age, 'memberID': memberID,
+            'borrowed_books': [book.lower() for book in books]}
+
+def import_patrons(db, rows, batch_size=BATCH_SIZE):
+    """Inserts the Patrons of the rows into the database in one commit.
+
+    Rows are parsed and inserted batch_size at a time so the input is never
+    held in memory whole, and the names of a batch are validated together
+    by Patron.from_records. Rows that cannot be parsed, rows with invalid
+    names, and rows whose memberID is already in the database or earlier
+    in the input, are reported instead of inserted.
+    
+    :param db: the Library_DB to insert into
+    :param rows: an iterable of (line number, row dictionary) tuples
+    :param batch_size: the number of Patrons inserted at a time
+    :returns: the number of Patrons inserted and the list of Rejections, by line
+    """
+    inserted = 0
+    rejections = []
+    batch = []
+    lines = []
+
+    def insert_batch(batch, lines):
+        patrons, rejected = Patron.from_records(batch)
+        for position, reason in rejected:
+            rejections.append(Rejection(lines[position], batch[position]['memberID'], reason))
+        if rejected:
+            skipped = {position for position, reason in rejected}
+            lines = [line for position, line in enumerate(lines) if position not in skipped]
+        count = 0
+        for line, patron, id in zip(lines, patrons, db.insert_patrons(patrons)):
+            if id is None:
+                rejections.append(Rejection(line, patron.get_memberID(), "Duplicate memberID"))
+            else:
+                count += 1
+        return count
+
+    with db.transaction():
+        for line, row in rows:
+            try:
+                record = parse_row(row)
+            except ValueError as e:
+                memberID = row.get('memberID') if isinstance(row, dict) else None
+                rejections.append(Rejection(line, memberID, str(e)))
+                continue
+            batch.append(record)
+            lines.append(line)
+            if len(batch) >= batch_size:
+                inserted += insert_batch(batch, lines)
+                batch, lines = [], []
+        if batch:
+            inserted += insert_batch(batch, lines)
+    rejections.sort(key=lambda rejection: rejection.line)
+    return inserted, rejections
+
+def import_csv(db, path, batch_size=BATCH_SIZE):
+    """Imports the Patrons of a CSV file, see import_patrons.
+    
+    :param db: the Library_DB to insert into
+    :param path: the path of the CSV file
+    :param batch_size: the number of Patrons inserted at a time
+    :returns: the number of Patrons inserted and the list of Rejections
+    """
+    return import_patrons(db, read_csv(path), batch_size)
+
+def import_jsonl(db, path, batch_size=BATCH_SIZE):
+    """Imports the Patrons of a JSON lines file, see import_patrons.
+    
+    :param db: the Library_DB to insert into
+    :param path: the path of the JSON lines file
+    :param batch_size: the number of Patrons inserted at a time
+    :returns: the number of Patrons inserted and the list of Rejections
+    """
+    return import_patrons(db, read_jsonl(path), batch_size)
+
+def export_csv(db, path):
+    """Writes every Patron of the database to a CSV file, one at a time.
+    
+    :param db: the Library_DB to export
+    :param path: the path of the CSV file
+    :returns: the number of Patrons written
+    """
+    count = 0
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for doc in db.iter_patrons():
+            writer.writerow([doc['fname'], doc['lname'], doc['age'], doc['memberID'],
+                             json.dumps(doc['borrowed_books'])])
+            count += 1
+    return count
+
+def export_jsonl(db, path):
+    """Writes every Patron of the database to a JSON lines file, one at a time.
+    
+    :param db: the Library_DB to export
+    :param path: the path of the JSON lines file
+    :returns: the number of Patrons written
+    """
+    count = 0
+    with open(path, 'w') as f:
+        for doc in db.iter_patrons():
+            f.write(json.dumps({field: doc[field] for field in FIELDS}) + '\n')
+            count += 1
+    return count
@@ -0,0 +1,90 @@
+"""
+Filename: response_cache.py
+Description: bounded in-process cache for API responses
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache:
+    """LRU cache with TTL expiry, bounded by entry count and total byte size."""
+
+    def __init__(self, ttl=300, max_entries=128, max_bytes=32 * 1024 * 1024, clock=time.monotonic):
+        """Constructor for the ResponseCache class.
+
+        :param ttl: the number of seconds an entry stays fresh
+        :param max_entries: the maximum number of entries kept
+        :param max_bytes: the maximum total size of the kept entries
+        :param clock: the function used to read the current time
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, stale=False):
+        """Gets a value from the cache.
+
+        Expired entries are misses but stay cached until they are replaced
+        or evicted, so they can still be served when the upstream is down.
+        
+        :param key: the key of the entry
+        :param stale: True to also return an expired value
+        :returns: the cached value, None if missing or expired
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (entry[0] <= self.clock() and not stale):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, size):
+        """Adds a value to the cache, evicting the least recently used entries.
+        
+        :param key: the key of the entry
+        :param value: the value to cache
+        :param size: the size of the value in bytes
+        """
+        with self.lock:
+            if key in self.entries:
+                self.remove_entry(key)
+            if size > self.max_bytes or self.max_entries <= 0:
+                return
+            self.entries[key] = (self.clock() + self.ttl, size, value)
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self.remove_entry(next(iter(self.entries)))
+                self.evictions += 1
+
+    def remove_entry(self, key):
+        """Removes an entry and releases its size. The lock must be held."""
+        expires, size, value = self.entries.pop(key)
+        self.size -= size
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """Gets the counters of the cache.
+        
+        :returns: a dictionary with the hits, misses, evictions, entries and bytes
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.entries), 'bytes': self.size}
@@ -0,0 +1,114 @@
+"""
+Filename: response_store.py
+Description: on-disk record/replay store for API responses
+"""
+
+import json
+import mmap
+import os
+import threading
+import zlib
+
+class ResponseStore:
+    """Indexed, compressed store of response bodies keyed by URL.
+
+    Bodies are zlib-compressed and appended to a data file, and an index
+    file maps each key to the offset and length of its body. In replay
+    mode the data file is memory-mapped so a lookup is a dictionary hit
+    plus a slice and a decompress.
+    """
+
+    RECORD = 'record'
+    REPLAY = 'replay'
+
+    def __init__(self, path, mode=REPLAY):
+        """Constructor for the ResponseStore class.
+        
+        :param path: the path of the store, without the .dat/.idx extension
+        :param mode: RECORD to add responses to the store, REPLAY to read them
+        """
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError("mode should be '%s' or '%s'" % (self.RECORD, self.REPLAY))
+        self.mode = mode
+        self.data_file = path + '.dat'
+        self.index_file = path + '.idx'
+        self.index = {}
+        self.lock = threading.Lock()
+        self.data = None
+        self.map = None
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'r') as f:
+                self.index = json.load(f)
+        if mode == self.RECORD:
+            self.data = open(self.data_file, 'ab')
+        elif os.path.exists(self.data_file) and os.path.getsize(self.data_file) > 0:
+            self.data = open(self.data_file, 'rb')
+            self.map = mmap.mmap(self.data.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def recording(self):
+        """True if responses are added to the store."""
+        return self.mode == self.RECORD
+
+    @property
+    def replaying(self):
+        """True if responses are answered from the store."""
+        return self.mode == self.REPLAY
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, key):
+        """Gets a stored response body.
+        
+        :param key: the key of the response, usually the normalized URL
+        :returns: the body as bytes, None if the key was never recorded
+        """
+        entry = self.index.get(key)
+        if entry is None or self.map is None:
+            return None
+        offset, length = entry
+        return zlib.decompress(self.map[offset:offset + length])
+
+    def put(self, key, body):
+        """Adds a response body to the store, replacing any earlier one for the key.
+        
+        :param key: the key of the response, usually the normalized URL
+        :param body: the body as bytes
+        """
+        if not self.recording:
+            raise ValueError("store is not open for recording")
+        compressed = zlib.compress(body)
+        with self.lock:
+            offset = self.data.seek(0, os.SEEK_END)
+            self.data.write(compressed)
+            self.index[key] = (offset, len(compressed))
+
+    def flush(self):
+        """Writes the recorded bodies and the index to disk."""
+        if not self.recording:
+            return
+        with self.lock:
+            self.data.flush()
+            with open(self.index_file + '.tmp', 'w') as f:
+                json.dump(self.index, f)
+            os.replace(self.index_file + '.tmp', self.index_file)
+
+    def close(self):
+        """Flushes the store and closes its files."""
+        self.flush()
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.data is not None:
+            self.data.close()
+            self.data = None
@@ -0,0 +1,119 @@
+"""
+Filename: search_result.py
+Description: search results indexed by normalized title
+"""
+
+from library.book_index import normalize_title
+
+class BookPage(list):
+    """The BookRecords of one search page, with their titles normalized once.
+
+    Pages are what the response cache holds, so the normalized titles are
+    computed the first time a page is read and reused by every later query
+    answered from the same cached response.
+    """
+
+    def __init__(self, docs=()):
+        """Constructor for the BookPage class.
+
+        :param docs: the BookRecords of the page
+        """
+        super().__init__(docs)
+        self.normalized = {}
+
+    def normalized_titles(self, field):
+        """Gets the normalized value of a title field for each doc.
+
+        :param field: the title field, 'title' or 'title_suggest'
+        :returns: a list of normalized titles in the order of the docs
+        """
+        titles = self.normalized.get(field)
+        if titles is None:
+            titles = [normalize_title(getattr(doc, field) or '') for doc in self]
+            self.normalized[field] = titles
+        return titles
+
+def normalized_titles(docs, field):
+    """Gets the normalized titles of a page, from its BookPage cache when it has one."""
+    if isinstance(docs, BookPage):
+        return docs.normalized_titles(field)
+    return [normalize_title(getattr(doc, field) or '') for doc in docs]
+
+class SearchResult(list):
+    """List of search results that also indexes them by normalized title.
+
+    Titles are compared ignoring case, punctuation and spacing, see
+    book_index.normalize_title. has_title and ebook_count are dictionary
+    lookups. The index is only kept up to date by the add methods, so the
+    list should not be changed otherwise.
+    """
+
+    def __init__(self, items=()):
+        """Constructor for the SearchResult class.
+
+        :param items: book titles, or dictionaries with 'title' and 'ebook_count'
+        """
+        super().__init__()
+        self.titles = {}
+        self.total = 0
+        for item in items:
+            if isinstance(item, str):
+                self.add(item, normalize_title(item))
+            else:
+                self.add(item, normalize_title(item['title']), item.get('ebook_count') or 0)
+
+    @classmethod
+    def of(cls, items):
+        """Gets items as a SearchResult, indexing them only if they are not one already.
+
+        :param items: a SearchResult, or a list accepted by the constructor
+        :returns: the SearchResult
+        """
+        return items if isinstance(items, cls) else cls(items)
+
+    def add(self, item, normalized, ebook_count=0):
+        """Appends a result under its normalized title.
+
+        :param item: the result
+        :param normalized: the normalized title of the result
+        :param ebook_count: the number of ebooks of the result
+        """
+        self.append(item)
+        self.titles[normalized] = self.titles.get(normalized, 0) + ebook_count
+        self.total += ebook_count
+
+    def add_titles(self, docs):
+        """Appends the suggested titles of a page of search docs.
+
+        :param docs: the BookRecords of a search page
+        """
+        for doc, normalized in zip(docs, normalized_titles(docs, 'title_suggest')):
+            self.add(doc.title_suggest, normalized)
+
+    def add_ebooks(self, docs):
+        """Appends the books that have ebooks from a page of search docs.
+
+        :param docs: the BookRecords of a search page
+        """
+        for doc, normalized in zip(docs, normalized_titles(docs, 'title')):
+            if (doc.ebook_count_i or 0) >= 1:
+                self.add({'title': doc.title, 'ebook_count': doc.ebook_count_i}, normalized,
+                         doc.ebook_count_i)
+
+    def has_title(self, title):
+        """Determines if a result has the title.
+
+        :param title: the title of the book
+        :returns: True if found, False if not
+        """
+        return normalize_title(title) in self.titles
+
+    def ebook_count(self, title=None):
+        """Gets the number of ebooks of the results with a title, or of every result.
+
+        :param title: the title of the book, None for every result
+        :returns: the number of ebooks
+        """
+        if title is None:
+            return self.total
+        return self.titles.get(normalize_title(title), 0)
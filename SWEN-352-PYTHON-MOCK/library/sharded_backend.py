@@ -0,0 +1,231 @@
+"""
+Filename: sharded_backend.py
+Description: patron storage backend that spreads patrons over several backends
+"""
+
+import json
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, ExitStack
+from library.tinydb_backend import TinyDBBackend
+
+def shard_of(memberID, shards):
+    """Gets the shard a memberID belongs to.
+
+    :param memberID: the ID of the Patron
+    :param shards: the number of shards
+    :returns: the index of the shard
+    """
+    return zlib.crc32(str(memberID).encode('utf-8')) % shards
+
+class ShardedBackend:
+    """Hash-partitions patron records by memberID over several backends.
+
+    Each shard is a backend of its own in the shard directory, so a change
+    rewrites or locks only the shard holding that patron. Shards are opened
+    the first time they are needed. count, flush and close fan out over the
+    shards, on a thread pool when max_workers is above one.
+
+    The number of shards is kept in the directory's manifest. Changing it
+    means moving patrons between shards, which migrate.reshard does.
+    """
+
+    MANIFEST = 'shards.json'
+
+    def __init__(self, directory, shards=None, backend_cls=TinyDBBackend, extension='.json',
+                 max_workers=1):
+        """Constructor for the ShardedBackend class.
+
+        :param directory: the directory holding the shards, created if missing
+        :param shards: the number of shards, read from the manifest if None
+        :param backend_cls: the class of the shards, called with the path of the shard
+        :param extension: the extension of the shard files
+        :param max_workers: the number of threads used to fan out over the shards
+        :raises ValueError: if shards does not match the manifest
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest = os.path.join(directory, self.MANIFEST)
+        stored = None
+        if os.path.exists(manifest):
+            with open(manifest, 'r') as f:
+                stored = json.load(f)['shards']
+        if shards is None:
+            shards = stored or 1
+        elif stored is not None and stored != shards:
+            raise ValueError("%s has %d shards, not %d" % (directory, stored, shards))
+        if stored is None:
+            with open(manifest, 'w') as f:
+                json.dump({'shards': shards}, f)
+        self.directory = directory
+        self.backend_cls = backend_cls
+        self.extension = extension
+        self.max_workers = max_workers
+        self.shards = [None] * shards
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.stack = None
+        self.joined = set()
+
+    def shard_path(self, i):
+        """Gets the path of the file of shard i."""
+        return os.path.join(self.directory, 'shard-%03d%s' % (i, self.extension))
+
+    def open_shard(self, i):
+        """Gets shard i, opening it if needed, without joining a transaction.
+
+        The shard is opened before the lock is taken, so several threads can
+        open shards at once. If another thread opened the same shard first,
+        that one is kept and this one is closed.
+        """
+        shard = self.shards[i]
+        if shard is not None:
+            return shard
+        shard = self.backend_cls(self.shard_path(i))
+        with self.lock:
+            if self.shards[i] is None:
+                self.shards[i] = shard
+                return shard
+        shard.close()
+        return self.shards[i]
+
+    def shard(self, i):
+        """Gets shard i, opening it if needed.
+
+        Inside a transaction the shard joins it the first time it is used.
+        """
+        with self.lock:
+            shard = self.open_shard(i)
+            if self.depth and i not in self.joined:
+                self.stack.enter_context(shard.transaction())
+                self.joined.add(i)
+            return shard
+
+    def shard_for(self, memberID):
+        """Gets the shard holding the memberID, opening it if needed."""
+        return self.shard(shard_of(memberID, len(self.shards)))
+
+    def fan_out(self, fn, shards):
+        """Calls fn on each shard, or shard index, in parallel if max_workers allows.
+
+        :returns: the list of results, in shard order
+        """
+        if self.max_workers > 1 and len(shards) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return list(executor.map(fn, shards))
+        return [fn(shard) for shard in shards]
+
+    def loaded(self):
+        """Gets the shards that are open."""
+        return [shard for shard in self.shards if shard is not None]
+
+    def __iter__(self):
+        for i in range(len(self.shards)):
+            for record in self.shard(i):
+                yield record
+
+    def count(self):
+        """Gets the number of records over every shard.
+
+        Each worker opens the shards it counts. Inside a transaction the
+        shards are opened and counted one after another instead, as they
+        must join it on the thread holding it.
+
+        :returns: the number of records
+        """
+        if self.depth:
+            return sum(self.shard(i).count() for i in range(len(self.shards)))
+        return sum(self.fan_out(lambda i: self.open_shard(i).count(), range(len(self.shards))))
+
+    def contains(self, memberID):
+        """Determines if a record is stored for the memberID.
+
+        :param memberID: the ID of the Patron
+        :returns: True if stored, False if not
+        """
+        return self.shard_for(memberID).contains(memberID)
+
+    def insert(self, record):
+        """Inserts a record, which must not be stored yet.
+
+        :param record: the Patron record
+        :returns: the (shard, id) the record was stored under
+        """
+        i = shard_of(record['memberID'], len(self.shards))
+        return (i, self.shard(i).insert(record))
+
+    def insert_many(self, records):
+        """Inserts records, none of which may be stored yet, with one write per shard.
+
+        :param records: a list of Patron records
+        :returns: the list of (shard, id) the records were stored under
+        """
+        groups = {}
+        for position, record in enumerate(records):
+            groups.setdefault(shard_of(record['memberID'], len(self.shards)), []).append(position)
+        ids = [None] * len(records)
+        with self.transaction():
+            for i, positions in groups.items():
+                shard_ids = self.shard(i).insert_many([records[position] for position in positions])
+                for position, id in zip(positions, shard_ids):
+                    ids[position] = (i, id)
+        return ids
+
+    def get(self, memberID):
+        """Gets the record for the memberID.
+
+        :param memberID: the ID of the Patron
+        :returns: the record, None if not stored
+        """
+        return self.shard_for(memberID).get(memberID)
+
+    def update(self, record):
+        """Replaces the stored record with the same memberID.
+
+        :param record: the Patron record
+        :returns: True if updated, False if not stored
+        """
+        return self.shard_for(record['memberID']).update(record)
+
+    def remove(self, memberID):
+        """Removes the record for the memberID.
+
+        :param memberID: the ID of the Patron
+        :returns: True if removed, False if not stored
+        """
+        return self.shard_for(memberID).remove(memberID)
+
+    @contextmanager
+    def transaction(self):
+        """Groups the changes made in a with block into one transaction per shard.
+
+        Each shard used in the block joins the transaction. If the block
+        raises, every one of them rolls back. On success they commit one
+        after another, so a crash part way through the commits can leave
+        only some shards changed. Other threads wait until the
+        transaction ends.
+        """
+        with self.lock:
+            if self.depth == 0:
+                self.stack = ExitStack()
+                self.joined = set()
+            self.depth += 1
+            try:
+                yield self
+            except BaseException as e:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.stack.__exit__(type(e), e, e.__traceback__)
+                raise
+            self.depth -= 1
+            if self.depth == 0:
+                self.stack.close()
+
+    def flush(self):
+        """Writes any buffered changes of the open shards."""
+        self.fan_out(lambda shard: shard.flush(), self.loaded())
+
+    def close(self):
+        """Closes the open shards."""
+        self.fan_out(lambda shard: shard.close(), self.loaded())
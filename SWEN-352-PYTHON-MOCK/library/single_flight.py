@@ -0,0 +1,84 @@
+"""
+Filename: single_flight.py
+Description: coalescing of concurrent identical calls into one
+"""
+
+import asyncio
+import threading
+
+class Flight:
+    """One in-flight call and the outcome its waiters share."""
+
+    def __init__(self):
+        """Constructor for the Flight class."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Lets threads asking for the same key at the same time share one call."""
+
+    def __init__(self):
+        """Constructor for the SingleFlight class."""
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.coalesced = 0
+
+    def do(self, key, function, *args):
+        """Calls function(*args), unless a call for key is already in flight.
+
+        The first thread runs the call; threads arriving while it runs wait
+        for it and get the same result or exception.
+        
+        :param key: the key identifying equivalent calls
+        :param function: the function to call
+        :returns: the result of the shared call
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = function(*args)
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.result
+
+class AsyncSingleFlight:
+    """Lets asyncio tasks asking for the same key at the same time share one call."""
+
+    def __init__(self):
+        """Constructor for the AsyncSingleFlight class."""
+        self.flights = {}
+        self.coalesced = 0
+
+    async def do(self, key, function, *args):
+        """Awaits function(*args), unless a call for key is already in flight.
+
+        The shared call runs in its own task, so a waiter being cancelled
+        does not cancel it for the others.
+        
+        :param key: the key identifying equivalent calls
+        :param function: the coroutine function to call
+        :returns: the result of the shared call
+        """
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = self.flights[key] = asyncio.ensure_future(function(*args))
+            flight.add_done_callback(lambda done: self.flights.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(flight)
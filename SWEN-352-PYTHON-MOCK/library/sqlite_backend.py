@@ -0,0 +1,168 @@
+"""
+Filename: sqlite_backend.py
+Description: patron storage backend on a SQLite database
+"""
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+class SQLiteBackend:
+    """Stores patron records as rows of a SQLite table indexed by memberID.
+
+    The database runs in WAL mode, and every statement is a constant SQL
+    string so sqlite3 reuses its prepared statement. Outside of a
+    transaction each change commits on its own.
+    """
+
+    CREATE = """
+        CREATE TABLE IF NOT EXISTS patrons (
+            id INTEGER PRIMARY KEY,
+            memberID UNIQUE NOT NULL,
+            fname,
+            lname,
+            age,
+            borrowed_books TEXT NOT NULL
+        )
+    """
+    INSERT = ("INSERT INTO patrons (memberID, fname, lname, age, borrowed_books) "
+              "VALUES (?, ?, ?, ?, ?)")
+    SELECT = "SELECT fname, lname, age, memberID, borrowed_books FROM patrons WHERE memberID = ?"
+    UPDATE = ("UPDATE patrons SET fname = ?, lname = ?, age = ?, borrowed_books = ? "
+              "WHERE memberID = ?")
+    DELETE = "DELETE FROM patrons WHERE memberID = ?"
+    EXISTS = "SELECT 1 FROM patrons WHERE memberID = ?"
+    COUNT = "SELECT COUNT(*) FROM patrons"
+    PAGE = ("SELECT id, fname, lname, age, memberID, borrowed_books FROM patrons "
+            "WHERE id > ? ORDER BY id LIMIT ?")
+    PAGE_SIZE = 1000
+
+    def __init__(self, path, fsync=False):
+        """Constructor for the SQLiteBackend class.
+        
+        :param path: the path of the database file
+        :param fsync: True to sync every commit to disk, False to sync only at checkpoints
+        """
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=%s" % ('FULL' if fsync else 'NORMAL'))
+        self.conn.execute(self.CREATE)
+
+    def to_record(self, row):
+        """Converts a (fname, lname, age, memberID, borrowed_books) row to a record."""
+        return {'fname': row[0], 'lname': row[1], 'age': row[2], 'memberID': row[3],
+                'borrowed_books': json.loads(row[4])}
+
+    def __iter__(self):
+        last_id = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(self.PAGE, (last_id, self.PAGE_SIZE)).fetchall()
+            for row in rows:
+                yield self.to_record(row[1:])
+            if len(rows) < self.PAGE_SIZE:
+                return
+            last_id = rows[-1][0]
+
+    def count(self):
+        """Gets the number of records.
+        
+        :returns: the number of records
+        """
+        with self.lock:
+            return self.conn.execute(self.COUNT).fetchone()[0]
+
+    def contains(self, memberID):
+        """Determines if a record is stored for the memberID.
+        
+        :param memberID: the ID of the Patron
+        :returns: True if stored, False if not
+        """
+        with self.lock:
+            return self.conn.execute(self.EXISTS, (memberID,)).fetchone() is not None
+
+    def insert(self, record):
+        """Inserts a record, which must not be stored yet.
+        
+        :param record: the Patron record
+        :returns: the row id of the record
+        """
+        with self.lock:
+            return self.conn.execute(self.INSERT, (record['memberID'], record['fname'],
+                                                   record['lname'], record['age'],
+                                                   json.dumps(record['borrowed_books']))).lastrowid
+
+    def insert_many(self, records):
+        """Inserts records, none of which may be stored yet, in one commit.
+        
+        :param records: a list of Patron records
+        :returns: the list of row ids of the records
+        """
+        with self.transaction():
+            return [self.insert(record) for record in records]
+
+    def get(self, memberID):
+        """Gets the record for the memberID.
+        
+        :param memberID: the ID of the Patron
+        :returns: the record, None if not stored
+        """
+        with self.lock:
+            row = self.conn.execute(self.SELECT, (memberID,)).fetchone()
+        return self.to_record(row) if row else None
+
+    def update(self, record):
+        """Replaces the stored record with the same memberID.
+        
+        :param record: the Patron record
+        :returns: True if updated, False if not stored
+        """
+        with self.lock:
+            cursor = self.conn.execute(self.UPDATE, (record['fname'], record['lname'],
+                                                     record['age'],
+                                                     json.dumps(record['borrowed_books']),
+                                                     record['memberID']))
+            return cursor.rowcount > 0
+
+    def remove(self, memberID):
+        """Removes the record for the memberID.
+        
+        :param memberID: the ID of the Patron
+        :returns: True if removed, False if not stored
+        """
+        with self.lock:
+            return self.conn.execute(self.DELETE, (memberID,)).rowcount > 0
+
+    @contextmanager
+    def transaction(self):
+        """Groups the changes made in a with block into a single commit.
+
+        If the block raises, its changes are rolled back. Nested transactions
+        join the outer one. Other threads wait until the transaction ends.
+        """
+        with self.lock:
+            if self.depth == 0:
+                self.conn.execute("BEGIN")
+            self.depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self.depth -= 1
+            if self.depth == 0:
+                self.conn.execute("COMMIT")
+
+    def flush(self):
+        """Does nothing, changes are committed as they are made."""
+        pass
+
+    def close(self):
+        """Closes the database."""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,235 @@
+"""
+Filename: storage.py
+Description: TinyDB storage classes used by the library database
+"""
+
+import fcntl
+import json
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from tinydb.storages import JSONStorage
+from tinydb.middlewares import Middleware
+
+class DurableJSONStorage(JSONStorage):
+    """JSON file storage whose writes replace the file atomically.
+
+    Each write goes to a temporary file that then replaces the database, so
+    a crash part way through leaves the previous version whole. The write
+    is fsynced, together with the directory entry, only when asked to.
+    """
+
+    def __init__(self, path, fsync=False, encoding=None, **kwargs):
+        """Constructor for the DurableJSONStorage class.
+        
+        :param path: the path of the JSON file
+        :param fsync: True to fsync the file after every write
+        :param encoding: the encoding of the file
+        """
+        super().__init__(path, encoding=encoding, **kwargs)
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        self.encoding = encoding
+        self.fsync = fsync
+
+    def reopen(self):
+        """Reopens the file, which another write may have replaced."""
+        self._handle.close()
+        self._handle = open(self.path, mode=self._mode, encoding=self.encoding)
+
+    def read(self):
+        """Gets the whole database, None if the file is empty.
+
+        If another process replaced the file since it was opened, the new
+        one is opened first.
+        """
+        if os.stat(self.path).st_ino != os.fstat(self._handle.fileno()).st_ino:
+            self.reopen()
+        return super().read()
+
+    def write(self, data):
+        """Replaces the content of the file with the given data.
+        
+        :param data: the whole database as a dictionary
+        """
+        with open(self.tmp_path, 'w', encoding=self.encoding) as f:
+            f.write(json.dumps(data, **self.kwargs))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(self.tmp_path, self.path)
+        if self.fsync:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.reopen()
+
+class WriteBehindMiddleware(Middleware):
+    """Keeps the database in memory and writes it out in batches.
+
+    Writes are flushed to the wrapped storage once flush_every of them are
+    pending or flush_interval seconds have passed since the last flush,
+    whichever comes first, and always on close. While a transaction is
+    open nothing is flushed until it commits.
+
+    There is no background thread: both thresholds are checked when a
+    write comes in, so changes buffered before a quiet spell stay in memory
+    until the next write, flush or close.
+    """
+
+    def __init__(self, storage_cls, flush_every=1, flush_interval=None, clock=time.monotonic):
+        """Constructor for the WriteBehindMiddleware class.
+        
+        :param storage_cls: the storage class to wrap
+        :param flush_every: the number of pending writes that triggers a flush
+        :param flush_interval: the number of seconds after which pending writes are flushed
+        :param clock: the function used to read the current time
+        """
+        super().__init__(storage_cls)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.cache = None
+        self.pending = 0
+        self.depth = 0
+        self.last_flush = clock()
+
+    def read(self):
+        """Gets the database, reading it from the wrapped storage only once."""
+        if self.cache is None:
+            self.cache = self.storage.read()
+        return self.cache
+
+    def write(self, data):
+        """Buffers the database and flushes it if a threshold is reached.
+        
+        :param data: the whole database as a dictionary
+        """
+        self.cache = data
+        self.pending += 1
+        if self.depth == 0 and self.flush_due():
+            self.flush()
+
+    def flush_due(self):
+        """Determines if the pending writes should be flushed now."""
+        if self.pending >= self.flush_every:
+            return True
+        return (self.flush_interval is not None
+                and self.clock() - self.last_flush >= self.flush_interval)
+
+    def flush(self):
+        """Writes the pending changes to the wrapped storage."""
+        if self.pending:
+            self.storage.write(self.cache)
+            self.pending = 0
+        self.last_flush = self.clock()
+
+    def begin(self):
+        """Opens a transaction, or joins the one already open.
+
+        Earlier buffered writes are flushed first so that a rollback only
+        drops the changes made inside the transaction.
+        """
+        if self.depth == 0:
+            self.flush()
+        self.depth += 1
+
+    def commit(self):
+        """Closes the transaction, flushing its writes in one go if it is the outermost."""
+        self.depth = max(self.depth - 1, 0)
+        if self.depth == 0:
+            self.flush()
+
+    def rollback(self):
+        """Closes a transaction that failed.
+
+        If it is the outermost, every change made since it began is dropped.
+        An inner transaction joined the outer one, so its changes stay until
+        the outer one commits or rolls back too.
+        """
+        self.depth = max(self.depth - 1, 0)
+        if self.depth == 0:
+            self.pending = 0
+            self.cache = None
+
+    def reload(self):
+        """Drops the cached database so the next read comes from the wrapped storage."""
+        self.cache = None
+        self.pending = 0
+
+    def close(self):
+        """Flushes the pending writes and closes the wrapped storage."""
+        self.flush()
+        self.storage.close()
+
+class ProcessLock:
+    """Reader/writer lock shared by every process using the same lock file.
+
+    The lock is an flock on the lock file, and the first eight bytes of
+    the file count the writes made under it. A process compares that
+    generation with the one it last saw to know if its cached copy of the
+    data is stale, without reading the data itself. Within a process the
+    lock is reentrant and also serializes threads.
+    """
+
+    GENERATION = struct.Struct('<Q')
+
+    def __init__(self, path):
+        """Constructor for the ProcessLock class.
+        
+        :param path: the path of the lock file, created if missing
+        """
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.lock = threading.RLock()
+        self.depth = 0
+
+    def generation(self):
+        """Gets the number of writes made under the lock so far."""
+        data = os.pread(self.fd, self.GENERATION.size, 0)
+        if len(data) < self.GENERATION.size:
+            return 0
+        return self.GENERATION.unpack(data)[0]
+
+    def bump(self):
+        """Counts a write, the exclusive lock must be held.
+        
+        :returns: the new generation
+        """
+        generation = self.generation() + 1
+        os.pwrite(self.fd, self.GENERATION.pack(generation), 0)
+        return generation
+
+    @contextmanager
+    def shared(self):
+        """Holds the lock for reading, other readers may hold it too."""
+        with self.lock:
+            if self.depth:
+                yield
+                return
+            fcntl.flock(self.fd, fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def exclusive(self):
+        """Holds the lock for writing, no other process may hold it."""
+        with self.lock:
+            if self.depth == 0:
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+            self.depth += 1
+            try:
+                yield
+            finally:
+                self.depth -= 1
+                if self.depth == 0:
+                    fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def close(self):
+        """Closes the lock file."""
+        os.close(self.fd)
@@ -0,0 +1,206 @@
+"""
+Filename: tinydb_backend.py
+Description: patron storage backend on a TinyDB JSON file
+"""
+
+from library.storage import DurableJSONStorage, WriteBehindMiddleware, ProcessLock
+from tinydb import TinyDB
+from contextlib import contextmanager
+
+class TinyDBBackend:
+    """Stores patron records as documents of a TinyDB JSON file.
+
+    Backends hold patron records, the dictionaries built by
+    Library_DB.convert_patron_to_db_format, keyed by their memberID. This
+    one keeps a memberID to document id index so lookups need no scan.
+
+    The file is read once and every later read is served from memory, so
+    without shared a backend assumes it is the only one using the file.
+    Two backends opened on the same file that way, in one process or in
+    several, never see each other's changes, and whichever writes last
+    overwrites the other's. Open every one of them with shared instead.
+
+    With shared, several processes may use the same file. Changes are made
+    under an exclusive ProcessLock on the file, and each process keeps its
+    in-memory copy of the database until the lock's generation shows that
+    another process has written.
+    """
+
+    def __init__(self, path, write_behind=False, flush_every=1000, flush_interval=5, fsync=False,
+                 shared=False):
+        """Constructor for the TinyDBBackend class.
+
+        By default every change is written to the file straight away. With
+        write_behind, changes are buffered in memory and written out every
+        flush_every changes or flush_interval seconds, and on close. The
+        interval is only checked when a change is made, so call flush to
+        write out changes left buffered while the database sits idle.
+        
+        :param path: the path of the database file
+        :param write_behind: True to buffer changes and write them in batches
+        :param flush_every: the number of buffered changes that triggers a write
+        :param flush_interval: the number of seconds after which buffered changes are written
+        :param fsync: True to fsync the file after every write
+        :param shared: True if other backends, in this process or others, use the file at the same time
+        """
+        if shared and write_behind:
+            raise ValueError("a shared database cannot buffer its writes")
+        if not write_behind:
+            flush_every, flush_interval = 1, None
+        self.storage = WriteBehindMiddleware(DurableJSONStorage, flush_every, flush_interval)
+        self.lock = ProcessLock(path + '.lock') if shared else None
+        self.generation = None
+        self.db = TinyDB(path, storage=self.storage, fsync=fsync)
+        self.refresh()
+        if self.generation is None:
+            self.build_index()
+
+    def build_index(self):
+        """Builds the memberID to document id index in one pass over the database."""
+        self.index = {doc['memberID']: doc.doc_id for doc in self.db.all()}
+
+    def refresh(self):
+        """Reloads the database if another process has written to it since it was read."""
+        if self.lock is None or self.lock.generation() == self.generation:
+            return
+        with self.lock.shared():
+            generation = self.lock.generation()
+            if generation == self.generation:
+                return
+            self.storage.reload()
+            self.db.clear_cache()
+            # TinyDB 4 tables remember the next document id, which another process may
+            # have used; clearing it makes the table work it out again from the data
+            self.db.table(self.db.default_table_name)._next_id = None
+            self.build_index()
+            self.generation = generation
+
+    @contextmanager
+    def writing(self):
+        """Holds the exclusive lock of a shared database around a change.
+
+        The database is brought up to date first, and the generation is
+        bumped once the outermost change is written.
+        """
+        if self.lock is None:
+            yield
+            return
+        with self.lock.exclusive():
+            self.refresh()
+            yield
+            if self.lock.depth == 1:
+                self.generation = self.lock.bump()
+
+    def __iter__(self):
+        self.refresh()
+        for doc in self.db:
+            yield doc
+
+    def count(self):
+        """Gets the number of records.
+        
+        :returns: the number of records
+        """
+        self.refresh()
+        return len(self.index)
+
+    def contains(self, memberID):
+        """Determines if a record is stored for the memberID.
+        
+        :param memberID: the ID of the Patron
+        :returns: True if stored, False if not
+        """
+        self.refresh()
+        return memberID in self.index
+
+    def insert(self, record):
+        """Inserts a record, which must not be stored yet.
+        
+        :param record: the Patron record
+        :returns: the document id of the record
+        """
+        with self.writing():
+            # a Document read from another TinyDB would keep its doc_id
+            doc_id = self.db.insert(dict(record))
+            self.index[record['memberID']] = doc_id
+            return doc_id
+
+    def insert_many(self, records):
+        """Inserts records, none of which may be stored yet, in one write.
+        
+        :param records: a list of Patron records
+        :returns: the list of document ids of the records
+        """
+        with self.writing():
+            doc_ids = self.db.insert_multiple([dict(record) for record in records])
+            for record, doc_id in zip(records, doc_ids):
+                self.index[record['memberID']] = doc_id
+            return doc_ids
+
+    def get(self, memberID):
+        """Gets the record for the memberID.
+        
+        :param memberID: the ID of the Patron
+        :returns: the record, None if not stored
+        """
+        self.refresh()
+        doc_id = self.index.get(memberID)
+        if doc_id is None:
+            return None
+        return self.db.get(doc_id=doc_id)
+
+    def update(self, record):
+        """Replaces the stored record with the same memberID.
+        
+        :param record: the Patron record
+        :returns: True if updated, False if not stored
+        """
+        with self.writing():
+            doc_id = self.index.get(record['memberID'])
+            if doc_id is None:
+                return False
+            self.db.update(record, doc_ids=[doc_id])
+            return True
+
+    def remove(self, memberID):
+        """Removes the record for the memberID.
+        
+        :param memberID: the ID of the Patron
+        :returns: True if removed, False if not stored
+        """
+        with self.writing():
+            doc_id = self.index.pop(memberID, None)
+            if doc_id is None:
+                return False
+            self.db.remove(doc_ids=[doc_id])
+            return True
+
+    @contextmanager
+    def transaction(self):
+        """Groups the changes made in a with block into a single write.
+
+        If the block raises, its changes are dropped. Nested transactions
+        join the outer one, so an inner block that raises only drops its
+        changes if the outer block raises as well. A shared database stays locked for the whole
+        block.
+        """
+        with self.writing():
+            self.storage.begin()
+            try:
+                yield self
+            except BaseException:
+                self.storage.rollback()
+                if self.storage.depth == 0:
+                    self.build_index()
+                raise
+            self.storage.commit()
+
+    def flush(self):
+        """Writes any buffered changes to the file."""
+        self.storage.flush()
+
+    def close(self):
+        """Closes the database, writing any buffered changes first."""
+        self.db.close()
+        if self.lock is not None:
+            self.lock.close()
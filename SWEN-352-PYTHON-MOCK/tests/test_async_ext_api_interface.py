@@ -0,0 +1,146 @@
+import unittest
+import asyncio
+import json
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from library import async_ext_api_interface
+
+class TestAsyncExtApiInterface(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        with open('tests_data/ebooks.txt', 'r') as f:
+            self.books_data = json.loads(f.read())
+        with open('tests_data/json_data.txt', 'r') as f:
+            self.docs = json.loads(f.read())['docs']
+        self.book = "learning python"
+        self.delay = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.hits = 0
+        self.fail_offset = None
+        app = web.Application()
+        app.router.add_get('/search.json', self.search)
+        app.router.add_get('/missing.json', self.missing)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.api = async_ext_api_interface.AsyncBooks_API(max_concurrency=3, timeout=1)
+        self.api.API_URL = str(self.server.make_url('/search.json'))
+
+    async def asyncTearDown(self):
+        await self.api.close()
+        await self.server.close()
+
+    # stub endpoint serving the recorded docs one page at a time
+    async def search(self, request):
+        offset, limit = int(request.query['offset']), int(request.query['limit'])
+        if offset == self.fail_offset:
+            return web.Response(status=404)
+        body = {'numFound': len(self.docs), 'docs': self.docs[offset:offset + limit]}
+        self.hits += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return web.json_response(body)
+
+    async def missing(self, request):
+        return web.Response(status=404)
+
+    async def test_is_book_available(self):
+        self.assertTrue(await self.api.is_book_available(self.book))
+
+    async def test_get_ebooks(self):
+        self.assertEqual(await self.api.get_ebooks(self.book), self.books_data)
+
+    async def test_get_book_summary(self):
+        summary = await self.api.get_book_summary(self.book)
+        self.assertTrue(summary.available)
+        self.assertTrue(summary.is_ebook)
+        self.assertEqual(summary.ebook_count, sum(ebook['ebook_count'] for ebook in self.books_data))
+
+    async def test_books_by_author(self):
+        books = await self.api.books_by_author("Mark Lutz")
+        self.assertIn("Learning Python", books)
+
+    async def test_get_book_info(self):
+        info = await self.api.get_book_info(self.book)
+        self.assertEqual(info[0]['title'], "Learning Python")
+
+    async def test_non_200(self):
+        url = str(self.server.make_url('/missing.json'))
+        self.assertIsNone(await self.api.make_request(url))
+
+    async def test_timeout(self):
+        self.api.max_retries = 0
+        self.delay = 2
+        self.assertFalse(await self.api.is_book_available(self.book))
+
+    #Sets a short retry budget and verifies a slow response cannot outlast it
+    async def test_retry_budget_caps_attempt(self):
+        self.api = async_ext_api_interface.AsyncBooks_API(timeout=10, retry_budget=0.2)
+        self.api.API_URL = str(self.server.make_url('/search.json'))
+        self.delay = 2
+        start = asyncio.get_running_loop().time()
+        self.assertFalse(await self.api.is_book_available(self.book))
+        self.assertLess(asyncio.get_running_loop().time() - start, 1)
+
+    #Runs many distinct lookups at once and verifies the semaphore bounds them
+    async def test_bounded_concurrency(self):
+        self.delay = 0.05
+        results = await asyncio.gather(*[self.api.is_book_available("book %d" % i)
+                                         for i in range(10)])
+        self.assertEqual(results, [True] * 10)
+        self.assertEqual(self.max_in_flight, 3)
+
+    async def test_books_by_author_all_pages(self):
+        self.api.PAGE_SIZE = 30
+        books = await self.api.books_by_author("Mark Lutz")
+        self.assertEqual(books, [doc['title_suggest'] for doc in self.docs])
+        self.assertEqual(self.hits, 4)
+
+    async def test_iter_ebooks_prefetch(self):
+        self.api.PAGE_SIZE = 30
+        ebooks = [ebook async for ebook in self.api.iter_ebooks(self.book, prefetch=True)]
+        self.assertEqual(ebooks, self.books_data)
+
+    async def test_middle_page_fails(self):
+        self.api.PAGE_SIZE = 30
+        self.fail_offset = 30
+        with self.assertRaises(async_ext_api_interface.IncompleteSearchError):
+            await self.api.books_by_author("Mark Lutz")
+
+    async def test_concurrent_requests_coalesced(self):
+        self.delay = 0.05
+        results = await asyncio.gather(*[self.api.is_book_available(self.book) for i in range(5)])
+        self.assertEqual(results, [True] * 5)
+        self.assertEqual(self.hits, 1)
+        self.assertEqual(self.api.flights.coalesced, 4)
+
+    async def test_retry_then_breaker(self):
+        url = str(self.server.make_url('/missing.json'))
+        self.api.breaker.failure_threshold = 1
+        self.assertIsNone(await self.api.make_request(url))
+        self.assertEqual(self.api.stats()['breaker']['state'], 'closed')
+        self.api.RETRY_STATUSES = (404,)
+        self.assertIsNone(await self.api.make_request(url))
+        self.assertEqual(self.api.retries, 2)
+        self.assertEqual(self.api.stats()['breaker']['state'], 'open')
+
+    #Cancels a half-open probe and verifies the breaker re-opens instead of waiting on it
+    async def test_cancelled_probe_reopens_breaker(self):
+        self.delay = 1
+        for i in range(self.api.breaker.failure_threshold):
+            self.api.breaker.record_failure()
+        self.api.breaker.opened_at -= self.api.breaker.reset_timeout
+        self.assertTrue(self.api.breaker.allow_request())
+        task = asyncio.create_task(self.api.get_with_retries(self.api.search_url('q', self.book, self.api.TITLE_FIELDS)))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.api.stats()['breaker']['state'], 'open')
+
+    async def test_cached(self):
+        await self.api.get_ebooks(self.book)
+        await self.api.get_book_info(self.book)
+        self.assertEqual(self.hits, 1)
@@ -0,0 +1,76 @@
+import unittest
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+from library import book_index
+
+class TestBookIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = book_index.BookIndex(':memory:')
+        with open('tests_data/json_data.txt', 'r') as f:
+            self.json_data = json.loads(f.read())
+
+    def tearDown(self):
+        self.index.close()
+
+    def test_normalize_title(self):
+        self.assertEqual(book_index.normalize_title("  Learning PYTHON: 2nd  ed. "),
+                         "learning python 2nd ed")
+
+    def test_add_search_response(self):
+        self.assertEqual(self.index.add_search_response(self.json_data), 100)
+        self.assertEqual(len(self.index), 100)
+        self.assertEqual(self.index.add_search_response(None), 0)
+
+    def test_contains_title(self):
+        self.index.add_search_response(self.json_data)
+        self.assertTrue(self.index.contains_title("learning python"))
+        self.assertTrue(self.index.contains_title("Python, Learning"))
+        self.assertFalse(self.index.contains_title("learning rust"))
+        self.assertFalse(self.index.contains_title(""))
+
+    def test_has_book_by_author(self):
+        self.index.add_search_response(self.json_data)
+        self.assertTrue(self.index.has_book_by_author("Mark Lutz", "Learning Python"))
+        self.assertFalse(self.index.has_book_by_author("Mark Lutz", "Learning"))
+        self.assertFalse(self.index.has_book_by_author("Nobody", "Learning Python"))
+
+    #Indexes more books by one author than SQLite allows bound variables and looks one up
+    def test_has_book_by_prolific_author(self):
+        self.index.conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 100)
+        self.index.add_docs([{'key': '/works/%d' % i, 'title': 'Book %d' % i,
+                              'author_name': ['Prolific Writer']} for i in range(200)])
+        self.assertTrue(self.index.has_book_by_author("Prolific Writer", "Book 199"))
+        self.assertFalse(self.index.has_book_by_author("Prolific Writer", "Book 200"))
+
+    #Re-adds a doc under the same key and verifies the old title is forgotten
+    def test_incremental_update(self):
+        self.index.add_docs([{'key': '/works/1', 'title': 'Old Title', 'author_name': ['A B']}])
+        self.index.add_docs([{'key': '/works/1', 'title': 'New Title', 'author_name': ['A B']}])
+        self.assertEqual(len(self.index), 1)
+        self.assertFalse(self.index.contains_title("old title"))
+        self.assertTrue(self.index.has_book_by_author("a b", "new title"))
+
+    def test_persisted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'books.idx')
+            index = book_index.BookIndex(path)
+            index.add_search_response(self.json_data)
+            index.close()
+            index = book_index.BookIndex(path)
+            self.assertTrue(index.contains_title("learning python"))
+            index.close()
+
+    def test_add_dump(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'works.txt.gz')
+            with gzip.open(path, 'wt') as f:
+                f.write('/type/work\t/works/1\t1\t2020-01-01\t%s\n'
+                        % json.dumps({'key': '/works/1', 'title': 'Dumped Book'}))
+                f.write('%s\n' % json.dumps({'key': '/works/2', 'title': 'Plain Line'}))
+            self.assertEqual(self.index.add_dump(path), 2)
+        self.assertTrue(self.index.contains_title("dumped book"))
+        self.assertTrue(self.index.contains_title("plain line"))
@@ -0,0 +1,38 @@
+import unittest
+from library import borrow_index
+
+class TestBorrowIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = borrow_index.BorrowIndex()
+        self.index.build([{'memberID': 1, 'borrowed_books': ['learning python', 'dune']},
+                          {'memberID': 2, 'borrowed_books': ['Dune']},
+                          {'memberID': 3, 'borrowed_books': []}])
+
+    def test_build(self):
+        self.assertEqual(self.index.borrowers('DUNE'), {1, 2})
+        self.assertEqual(self.index.count('Learning Python'), 1)
+        self.assertEqual(self.index.count('Emma'), 0)
+        self.assertEqual(self.index.borrowers('Emma'), frozenset())
+
+    def test_add(self):
+        self.index.add('Emma', 3)
+        self.index.add('Dune', 3)
+        self.index.add('Dune', 3)
+        self.assertEqual(self.index.borrowers('emma'), {3})
+        self.assertEqual(self.index.count('dune'), 3)
+
+    #Returns every copy of a book and verifies its title is dropped from the index
+    def test_remove(self):
+        self.index.remove('Dune', 1)
+        self.assertEqual(self.index.borrowers('dune'), {2})
+        self.index.remove('Dune', 2)
+        self.assertNotIn('dune', self.index.titles)
+        self.index.remove('Dune', 2)
+        self.index.remove('Emma', 1)
+        self.assertEqual(self.index.count('dune'), 0)
+
+    def test_borrowers_is_a_copy(self):
+        borrowers = self.index.borrowers('dune')
+        self.index.add('Dune', 3)
+        self.assertEqual(borrowers, {1, 2})
@@ -0,0 +1,59 @@
+import unittest
+from library import circuit_breaker
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.breaker = circuit_breaker.CircuitBreaker(failure_threshold=2, reset_timeout=10,
+                                                      clock=lambda: self.now)
+
+    def test_closed_allows(self):
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.stats()['state'], 'closed')
+
+    def test_opens_after_threshold(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.breaker.stats(), {'state': 'open', 'failures': 2,
+                                                'times_opened': 1, 'rejected': 1})
+
+    def test_success_resets_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+
+    #Waits out the reset timeout and verifies only one probe is let through
+    def test_half_open_single_probe(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now = 10
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_probe_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now = 10
+        self.breaker.allow_request()
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow_request())
+        self.now = 19
+        self.assertFalse(self.breaker.allow_request())
+
+    #Lets a probe go unreported and verifies a new probe is allowed after the reset timeout
+    def test_stuck_probe_times_out(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now = 10
+        self.assertTrue(self.breaker.allow_request())
+        self.now = 19
+        self.assertFalse(self.breaker.allow_request())
+        self.now = 20
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.stats()['state'], 'half-open')
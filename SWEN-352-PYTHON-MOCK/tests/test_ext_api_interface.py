@@ -1,8 +1,13 @@
 import unittest
-from library import ext_api_interface
-from unittest.mock import Mock
+from library import ext_api_interface, response_store, book_index, search_result
+from unittest.mock import Mock, patch
 import requests
 import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl
 
 class TestExtApiInterface(unittest.TestCase):
     def setUp(self):
@@ -13,20 +18,286 @@ class TestExtApiInterface(unittest.TestCase):
         with open('tests_data/json_data.txt', 'r') as f:
             self.json_data = json.loads(f.read())
 
+    def tearDown(self):
+        self.api.close()
+
+    # stands in for session.get, serving the recorded docs one page at a time
+    def paged_response(self, url, **kwargs):
+        query = dict(parse_qsl(urlsplit(url).query))
+        offset, limit = int(query['offset']), int(query['limit'])
+        docs = self.json_data['docs']
+        body = {'numFound': len(docs), 'docs': docs[offset:offset + limit]}
+        return Mock(status_code=200, content=json.dumps(body).encode(),
+                    **{'json.return_value': body})
+
     def test_make_request_True(self):
-        attr = {'json.return_value': dict()}
-        requests.get = Mock(return_value = Mock(status_code = 200, **attr))
+        attr = {'json.return_value': dict(), 'content': b'{}'}
+        self.api.session.get = Mock(return_value = Mock(status_code = 200, **attr))
         self.assertEqual(self.api.make_request(""), dict())
 
     def test_make_request_connection_error(self):
-        ext_api_interface.requests.get = Mock(side_effect=requests.ConnectionError)
+        self.api.session.get = Mock(side_effect=requests.ConnectionError)
         url = "some url"
         self.assertEqual(self.api.make_request(url), None)
 
     def test_make_request_False(self):
-        requests.get = Mock(return_value=Mock(status_code=100))
+        self.api.session.get = Mock(return_value=Mock(status_code=100))
         self.assertEqual(self.api.make_request(""), None)
 
+    def test_make_request_reuses_session(self):
+        attr = {'json.return_value': dict(), 'content': b'{}'}
+        self.api.session.get = Mock(return_value = Mock(status_code = 200, **attr))
+        self.api.make_request("url one")
+        self.api.make_request("url two")
+        self.assertEqual(self.api.session.get.call_count, 2)
+
+    def test_make_request_cached(self):
+        attr = {'json.return_value': self.json_data, 'content': b'{}'}
+        self.api.session.get = Mock(return_value=Mock(status_code=200, **attr))
+        self.api.make_request("%s?q=Learning  Python" % self.api.API_URL)
+        self.assertEqual(self.api.make_request("%s?q=learning python" % self.api.API_URL),
+                         self.json_data)
+        self.assertEqual(self.api.session.get.call_count, 1)
+        self.assertEqual(self.api.cache.stats()['hits'], 1)
+
+    def test_make_request_error_not_cached(self):
+        self.api.session.get = Mock(return_value=Mock(status_code=404))
+        self.api.make_request("url")
+        self.api.make_request("url")
+        self.assertEqual(self.api.session.get.call_count, 2)
+
+    def test_query_methods_share_fetch(self):
+        self.api.session.get = Mock(side_effect=self.paged_response)
+        self.assertTrue(self.api.is_book_available(self.book))
+        self.assertEqual(self.api.get_ebooks(self.book), self.books_data)
+        self.api.get_book_info(self.book)
+        self.assertEqual(self.api.session.get.call_count, 1)
+
+    #Pages through the recorded docs 30 at a time and verifies none are dropped
+    def test_books_by_author_all_pages(self):
+        self.api.PAGE_SIZE = 30
+        self.api.session.get = Mock(side_effect=self.paged_response)
+        books = self.api.books_by_author("Mark Lutz")
+        self.assertEqual(books, [doc['title_suggest'] for doc in self.json_data['docs']])
+        self.assertEqual(self.api.session.get.call_count, 4)
+
+    #Asks two title questions of the same search and verifies the titles
+    #of the cached response are only normalized once
+    def test_get_ebooks_index_cached(self):
+        self.api.session.get = Mock(side_effect=self.paged_response)
+        first = self.api.get_ebooks(self.book)
+        with patch('library.search_result.normalize_title') as normalize:
+            second = self.api.get_ebooks(self.book)
+        normalize.assert_not_called()
+        self.assertEqual(second, first)
+        self.assertEqual(second.titles, first.titles)
+        self.assertIsInstance(second, search_result.SearchResult)
+
+    #Summarizes a book across pages and verifies it matches the separate queries
+    #while fetching each page once
+    def test_get_book_summary(self):
+        self.api.PAGE_SIZE = 30
+        self.api.session.get = Mock(side_effect=self.paged_response)
+        summary = self.api.get_book_summary(self.book)
+        pages = self.api.session.get.call_count
+        ebooks = self.api.get_ebooks(self.book)
+        languages = set()
+        for info in self.api.get_book_info(self.book):
+            languages.update(info.get('language', ()))
+        self.assertEqual(summary, ext_api_interface.BookSummary(
+            True, ebooks.has_title(self.book), ebooks.ebook_count(), languages))
+        self.assertEqual(self.api.session.get.call_count, pages)
+
+    def test_get_book_summary_not_found(self):
+        self.api.make_request = Mock(return_value=None)
+        self.assertEqual(self.api.get_book_summary(self.book),
+                         ext_api_interface.BookSummary(False, False, 0, set()))
+
+    #Indexes the book and verifies the summary agrees with is_book_available
+    #when the search itself fails
+    def test_get_book_summary_uses_index(self):
+        self.api.index = book_index.BookIndex(':memory:')
+        self.api.index.add_search_response(self.json_data)
+        self.api.make_request = Mock(return_value=None)
+        self.assertTrue(self.api.get_book_summary(self.book).available)
+        self.assertTrue(self.api.is_book_available(self.book))
+
+    #Fails the second of four pages and verifies the search raises instead of
+    #returning the first page as the whole result
+    def test_middle_page_fails(self):
+        self.api.PAGE_SIZE = 30
+        def fail_second_page(url, **kwargs):
+            if 'offset=30&' in url:
+                return Mock(status_code=404)
+            return self.paged_response(url)
+        self.api.session.get = Mock(side_effect=fail_second_page)
+        with self.assertRaises(ext_api_interface.IncompleteSearchError):
+            self.api.get_ebooks(self.book)
+        with self.assertRaises(ext_api_interface.IncompleteSearchError):
+            list(self.api.iter_book_info(self.book, prefetch=True))
+
+    def test_get_book_info_prefetch(self):
+        self.api.PAGE_SIZE = 30
+        self.api.session.get = Mock(side_effect=self.paged_response)
+        self.assertEqual(list(self.api.iter_book_info(self.book, prefetch=True)),
+                         self.api.get_book_info(self.book))
+
+    #Stops after the first title and verifies later pages are never fetched
+    def test_iter_stops_early(self):
+        self.api.PAGE_SIZE = 30
+        self.api.session.get = Mock(side_effect=self.paged_response)
+        books = self.api.iter_books_by_author("Mark Lutz")
+        self.assertEqual(next(books), "Learning Python")
+        books.close()
+        self.assertEqual(self.api.session.get.call_count, 1)
+
+    def test_pages_stop_at_num_found(self):
+        self.api.PAGE_SIZE = 1
+        self.api.make_request = Mock(return_value={'numFound': 2, 'docs': [{'title_suggest': 'a'}]})
+        self.assertEqual(self.api.books_by_author("Mark Lutz"), ['a', 'a'])
+
+    def test_make_request_projects_fields(self):
+        attr = {'json.return_value': self.json_data, 'content': b'{}'}
+        self.api.session.get = Mock(return_value=Mock(status_code=200, **attr))
+        json_data = self.api.make_request("url", ('title', 'ebook_count_i'))
+        self.assertEqual(json_data['numFound'], 280)
+        self.assertEqual(json_data['docs'][0], ext_api_interface.BookRecord(
+            title='Learning Python', ebook_count_i=3))
+
+    def test_title_search_requests_fields(self):
+        self.api.session.get = Mock(return_value=Mock(status_code=404))
+        self.api.get_ebooks(self.book)
+        url = self.api.session.get.call_args[0][0]
+        self.assertIn("fields=title,publisher,publish_year,language,ebook_count_i", url)
+
+    def test_project_docs(self):
+        records = ext_api_interface.project_docs({'docs': [{'title': 'a', 'isbn': ['1']}]},
+                                                 ('title',))
+        self.assertEqual(records, [ext_api_interface.BookRecord(title='a')])
+        self.assertEqual(ext_api_interface.project_docs(None, ('title',)), [])
+
+    #Sends the same request from four threads and verifies one fetch is made
+    def test_make_request_coalesced(self):
+        release = threading.Event()
+        def get(url, **kwargs):
+            release.wait(5)
+            return Mock(status_code=200, content=b'{}', **{'json.return_value': self.json_data})
+        self.api.session.get = Mock(side_effect=get)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.api.make_request("url")))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while self.api.flights.coalesced < 3 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [self.json_data] * 4)
+        self.assertEqual(self.api.session.get.call_count, 1)
+
+    #Records a search, then replays it with a new Books_API that never touches the network
+    def test_record_and_replay(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'responses')
+            store = response_store.ResponseStore(path, response_store.ResponseStore.RECORD)
+            self.api.store = store
+            self.api.session.get = Mock(side_effect=self.paged_response)
+            self.api.get_ebooks(self.book)
+            store.close()
+
+            with response_store.ResponseStore(path) as store:
+                api = ext_api_interface.Books_API(store=store)
+                api.session.get = Mock()
+                self.assertEqual(api.get_ebooks(self.book), self.books_data)
+                self.assertFalse(api.is_book_available("unrecorded book"))
+                api.session.get.assert_not_called()
+                api.close()
+
+    def test_book_available_from_index(self):
+        self.api.index = book_index.BookIndex(':memory:')
+        self.api.index.add_search_response(self.json_data)
+        self.api.make_request = Mock()
+        self.assertTrue(self.api.is_book_available(self.book))
+        self.api.make_request.assert_not_called()
+
+    def test_book_available_index_miss(self):
+        self.api.index = book_index.BookIndex(':memory:')
+        self.api.make_request = Mock(return_value={'docs': [{'title': 'Unindexed'}]})
+        self.assertTrue(self.api.is_book_available("Unindexed"))
+        self.api.make_request.assert_called()
+
+    def test_book_available_complete_index(self):
+        self.api.index = book_index.BookIndex(':memory:', complete=True)
+        self.api.make_request = Mock()
+        self.assertFalse(self.api.is_book_available("Unindexed"))
+        self.api.make_request.assert_not_called()
+
+    def test_make_request_timeouts(self):
+        self.api.session.get = Mock(return_value=Mock(status_code=404))
+        self.api.make_request("url")
+        self.assertEqual(self.api.session.get.call_args[1]['timeout'], (3.05, 10))
+
+    #Fails twice with a 503 and verifies the third attempt's data is returned
+    def test_make_request_retries(self):
+        ok = Mock(status_code=200, content=b'{}', **{'json.return_value': {'docs': []}})
+        self.api.session.get = Mock(side_effect=[Mock(status_code=503),
+                                                 requests.Timeout(), ok])
+        self.assertEqual(self.api.make_request("url"), {'docs': []})
+        self.assertEqual(self.api.stats()['retries'], 2)
+
+    def test_make_request_retry_budget(self):
+        self.api.retry_budget = 0.05
+        self.api.backoff = 0.1
+        self.api.session.get = Mock(side_effect=requests.ConnectionError)
+        self.assertIsNone(self.api.make_request("url"))
+        self.assertEqual(self.api.session.get.call_count, 1)
+
+    def test_make_request_retries_chunked_encoding(self):
+        ok = Mock(status_code=200, content=b'{}', **{'json.return_value': {'docs': []}})
+        self.api.session.get = Mock(side_effect=[requests.exceptions.ChunkedEncodingError(), ok])
+        self.assertEqual(self.api.make_request("url"), {'docs': []})
+        self.assertEqual(self.api.stats()['breaker']['state'], 'closed')
+
+    #Raises an unexpected error from a half-open probe and verifies the breaker re-opens
+    def test_probe_error_reopens_breaker(self):
+        for i in range(self.api.breaker.failure_threshold):
+            self.api.breaker.record_failure()
+        self.api.breaker.opened_at -= self.api.breaker.reset_timeout
+        self.api.session.get = Mock(side_effect=RuntimeError)
+        with self.assertRaises(RuntimeError):
+            self.api.make_request("url")
+        self.assertEqual(self.api.stats()['breaker']['state'], 'open')
+
+    #Opens the breaker and verifies the stale cached response is served without a request
+    def test_breaker_serves_stale(self):
+        self.api.cache.ttl = 0
+        ok = Mock(status_code=200, content=b'{}', **{'json.return_value': {'docs': []}})
+        self.api.session.get = Mock(return_value=ok)
+        self.api.make_request("url")
+        for i in range(self.api.breaker.failure_threshold):
+            self.api.breaker.record_failure()
+        self.assertEqual(self.api.make_request("url"), {'docs': []})
+        self.assertIsNone(self.api.make_request("other url"))
+        self.assertEqual(self.api.session.get.call_count, 1)
+        self.assertEqual(self.api.stats()['breaker']['state'], 'open')
+
+    def test_normalize_url(self):
+        self.assertEqual(ext_api_interface.normalize_url("HTTP://OpenLibrary.org/search.json?q=A%20B&author=x"),
+                         ext_api_interface.normalize_url("http://openlibrary.org/search.json?author=X&q=a  b"))
+
+    def test_session_pool_size(self):
+        api = ext_api_interface.Books_API(pool_maxsize=4)
+        adapter = api.session.get_adapter(api.API_URL)
+        self.assertEqual(adapter.poolmanager.connection_pool_kw['maxsize'], 4)
+        api.close()
+
+    def test_close(self):
+        self.api.session.close = Mock()
+        self.api.close()
+        self.api.session.close.assert_called()
+
     # def test_get_ebooks(self):
     #     self.api.make_request = Mock(return_value=self.json_data)
     #     self.assertEqual(self.api.get_ebooks(self.book), self.books_data)
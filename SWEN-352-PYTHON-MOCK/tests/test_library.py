@@ -2,7 +2,9 @@ import unittest
 from unittest.mock import Mock
 from library import library
 from library import patron
+from library import book_index
 import json
+import threading
 
 class TestLibrary(unittest.TestCase):
 
@@ -39,6 +41,15 @@ class TestLibrary(unittest.TestCase):
         self.lib.api.books_by_author = Mock(return_value=["Learning Python", "Python Basics"])
         self.assertFalse(self.lib.is_book_by_author("Mark Lutz", "How to Train Your Dragon"))
 
+    #Answers from the local index and verifies no remote search is made
+    def test_is_book_by_author_from_index(self):
+        self.lib.api.index = book_index.BookIndex(':memory:', complete=True)
+        self.lib.api.index.add_docs([{'title': 'Learning Python', 'author_name': ['Mark Lutz']}])
+        self.lib.api.books_by_author = Mock()
+        self.assertTrue(self.lib.is_book_by_author("Mark Lutz", 'Learning Python'))
+        self.assertFalse(self.lib.is_book_by_author("Mark Lutz", "How to Train Your Dragon"))
+        self.lib.api.books_by_author.assert_not_called()
+
     #Does an assertEqual call with a books langauge in the mocked data
     def test_get_languages_for_book(self):
         self.lib.api.get_book_info = Mock(return_value=[{"title": "Learning Python", "language": ["eng"]}])
@@ -47,6 +58,38 @@ class TestLibrary(unittest.TestCase):
 
         self.assertEqual(result, {"eng"})
 
+    #Looks up a batch with a repeated title and verifies order and de-duplication
+    def test_is_ebook_many(self):
+        self.lib.api.get_ebooks = Mock(return_value=self.books_data)
+        result = self.lib.is_ebook_many(['learning python', 'How to Train Your Dragon',
+                                         'learning python'])
+        self.assertEqual(result, [True, False, True])
+        self.assertEqual(self.lib.api.get_ebooks.call_count, 2)
+
+    def test_get_ebooks_count_many(self):
+        self.lib.api.get_ebooks = Mock(return_value=self.books_data)
+        self.assertEqual(self.lib.get_ebooks_count_many(['learning python', 'python']), [8, 8])
+
+    #Fails one lookup and verifies the rest of the batch still comes back
+    def test_get_languages_for_books_partial(self):
+        def get_book_info(book):
+            if book == 'bad book':
+                raise ConnectionError()
+            return [{"title": book, "language": ["eng"]}]
+        self.lib.api.get_book_info = Mock(side_effect=get_book_info)
+        result = self.lib.get_languages_for_books(['Learning Python', 'bad book', 'Python'])
+        self.assertEqual(result, [{"eng"}, None, {"eng"}])
+
+    #Blocks every lookup until max_workers of them run at once
+    def test_batch_runs_in_parallel(self):
+        self.lib.max_workers = 4
+        barrier = threading.Barrier(4, timeout=5)
+        def get_ebooks(book):
+            barrier.wait()
+            return []
+        self.lib.api.get_ebooks = Mock(side_effect=get_ebooks)
+        self.assertEqual(self.lib.is_ebook_many(['a', 'b', 'c', 'd']), [False] * 4)
+
     #Does multiple assertEqual calls
     #Verifies the registered info is correct
     #Asserts the db insert method was called
@@ -112,4 +155,115 @@ class TestLibrary(unittest.TestCase):
         obj_patron = patron.Patron("John", "Smith", 25, 12345)
         self.lib.db.update_patron = Mock()
         
-        self.assertFalse(self.lib.is_book_borrowed("Learning Python", obj_patron))
\ No newline at end of file
+        self.assertFalse(self.lib.is_book_borrowed("Learning Python", obj_patron))
+    
+    #Builds the borrow index from the database on the first query
+    def test_get_borrowers(self):
+        self.lib.db.iter_patrons = Mock(return_value=iter([
+            {'memberID': 1, 'borrowed_books': ['learning python']},
+            {'memberID': 2, 'borrowed_books': ['learning python', 'dune']}]))
+        self.assertEqual(self.lib.get_borrowers('Learning Python'), {1, 2})
+        self.assertEqual(self.lib.count_borrowed('dune'), 1)
+        self.lib.db.iter_patrons.assert_called_once_with()
+
+    #Borrows and returns books and verifies the counts follow without reading the database
+    def test_count_borrowed_incremental(self):
+        self.lib.db.iter_patrons = Mock(return_value=iter([]))
+        self.lib.db.update_patron = Mock()
+        self.assertEqual(self.lib.count_borrowed('Learning Python'), 0)
+        first = patron.Patron("John", "Smith", 25, 1)
+        second = patron.Patron("Jane", "Smith", 25, 2)
+        self.lib.borrow_book("Learning Python", first)
+        self.lib.borrow_book("Learning Python", second)
+        self.assertEqual(self.lib.count_borrowed('learning python'), 2)
+        self.lib.return_borrowed_book("Learning Python", first)
+        self.assertEqual(self.lib.get_borrowers('Learning Python'), {2})
+        self.lib.db.iter_patrons.assert_called_once_with()
+
+    def test_borrow_book_before_index_built(self):
+        obj_patron = patron.Patron("John", "Smith", 25, 12345)
+        self.lib.db.update_patron = Mock()
+        self.lib.borrow_book("Learning Python", obj_patron)
+        self.assertIsNone(self.lib.borrow_index)
+
+    #Borrows twelve books and verifies the patron is written only once
+    def test_borrow_books(self):
+        obj_patron = patron.Patron("John", "Smith", 25, 12345)
+        self.lib.db.update_patron = Mock()
+        books = ["Book %s" % c for c in "ABCDEFGHIJKL"]
+        self.lib.borrow_books(books, obj_patron)
+        self.assertEqual(obj_patron.get_borrowed_books(), [book.lower() for book in books])
+        self.lib.db.update_patron.assert_called_once_with(obj_patron)
+
+    def test_return_books(self):
+        obj_patron = patron.Patron("John", "Smith", 25, 12345)
+        self.lib.db.update_patron = Mock()
+        self.lib.borrow_books(["Book A", "Book B", "Book C"], obj_patron)
+        self.lib.return_books(["Book A", "Book C", "Book D"], obj_patron)
+        self.assertEqual(obj_patron.get_borrowed_books(), ["book b"])
+        self.assertEqual(self.lib.db.update_patron.call_count, 2)
+
+    #Fails the write and verifies none of the books stay borrowed
+    def test_borrow_books_write_fails(self):
+        obj_patron = patron.Patron("John", "Smith", 25, 12345)
+        obj_patron.add_borrowed_book("Book A")
+        self.lib.db.update_patron = Mock(side_effect=IOError())
+        self.lib.borrow_index = library.BorrowIndex()
+        with self.assertRaises(IOError):
+            self.lib.borrow_books(["Book B", "Book C"], obj_patron)
+        self.assertEqual(obj_patron.get_borrowed_books(), ["book a"])
+        self.assertEqual(self.lib.count_borrowed("Book B"), 0)
+
+    def test_checkout_session(self):
+        obj_patron = patron.Patron("John", "Smith", 25, 12345)
+        obj_patron.add_borrowed_book("Book A")
+        self.lib.db.update_patron = Mock()
+        self.lib.db.iter_patrons = Mock(return_value=iter([obj_patron.to_record()]))
+        self.lib.build_borrow_index()
+        with self.lib.checkout_session(obj_patron) as session:
+            session.add_borrowed_book("Book B")
+            session.return_borrowed_book("Book A")
+            self.lib.db.update_patron.assert_not_called()
+        self.lib.db.update_patron.assert_called_once_with(obj_patron)
+        self.assertEqual(self.lib.get_borrowers("Book B"), {12345})
+        self.assertEqual(self.lib.count_borrowed("Book A"), 0)
+
+    def test_checkout_session_raises(self):
+        obj_patron = patron.Patron("John", "Smith", 25, 12345)
+        self.lib.db.update_patron = Mock()
+        with self.assertRaises(ValueError):
+            with self.lib.checkout_session(obj_patron) as session:
+                session.add_borrowed_book("Book B")
+                raise ValueError()
+        self.assertEqual(obj_patron.get_borrowed_books(), [])
+        self.lib.db.update_patron.assert_not_called()
+
+    #Runs sessions on a PatronView that already copied its record and verifies
+    #the change is written, and undone when the write fails
+    def test_checkout_session_view(self):
+        view = patron.PatronView({'fname': 'John', 'lname': 'Smith', 'age': 25,
+                                  'memberID': 12345, 'borrowed_books': []})
+        view.add_borrowed_book("x")
+        self.lib.db.update_patron = Mock()
+        with self.lib.checkout_session(view) as session:
+            session.add_borrowed_book("y")
+        self.lib.db.update_patron.assert_called_once_with(view)
+        self.lib.db.update_patron = Mock(side_effect=OSError)
+        with self.assertRaises(OSError):
+            with self.lib.checkout_session(view) as session:
+                session.add_borrowed_book("z")
+        self.assertEqual(view.get_borrowed_books(), ['x', 'y'])
+
+    def test_checkout_session_unchanged(self):
+        obj_patron = patron.Patron("John", "Smith", 25, 12345)
+        self.lib.db.update_patron = Mock()
+        self.lib.return_books(["Book A"], obj_patron)
+        self.lib.db.update_patron.assert_not_called()
+
+    def test_get_book_summary(self):
+        summary = library.BookSummary(True, True, 8, {'eng'})
+        self.lib.api.get_book_summary = Mock(return_value=summary)
+        self.assertEqual(self.lib.get_book_summary('learning python'), summary)
+        self.assertEqual(self.lib.get_book_summaries(['learning python', 'learning python']),
+                         [summary, summary])
+        self.assertEqual(self.lib.api.get_book_summary.call_count, 2)
@@ -1,6 +1,9 @@
 import unittest
+import unittest.mock
 from unittest.mock import Mock, MagicMock
-from library import library_db_interface, patron
+from library import library_db_interface, patron, tinydb_backend, sqlite_backend, log_backend, sharded_backend
+import os
+import tempfile
 
 class TestLibbraryDBInterface(unittest.TestCase):
 
@@ -12,7 +15,7 @@ class TestLibbraryDBInterface(unittest.TestCase):
 
     def test_insert_patron_not_in_db(self):
         patron_mock = Mock()
-        self.db_interface.retrieve_patron = Mock(return_value=None)
+        self.db_interface.db.contains = Mock(return_value=False)
         data = {'fname': 'name', 'lname': 'name', 'age': '2', 'memberID': '3',
                 'borrowed_books': []}
         self.db_interface.convert_patron_to_db_format = Mock(return_value=data)
@@ -21,8 +24,10 @@ class TestLibbraryDBInterface(unittest.TestCase):
 
     def test_insert_patron_already_in_db(self):
         patron_mock = Mock()
-        self.db_interface.retrieve_patron = Mock(return_value=patron_mock)
+        self.db_interface.db.contains = Mock(return_value=True)
+        self.db_interface.db.insert = Mock()
         self.assertIsNone(self.db_interface.insert_patron(patron_mock))
+        self.db_interface.db.insert.assert_not_called()
 
     def test_insert_patron_false_patron(self):
         patron_mock = MagicMock()
@@ -31,20 +36,46 @@ class TestLibbraryDBInterface(unittest.TestCase):
         patron_mock.__bool__.return_value = False
         self.assertIsNone(self.db_interface.insert_patron(patron_mock))
 
+    #Inserts a batch with a stored and a repeated memberID and verifies both are skipped
+    def test_insert_patrons(self):
+        patrons = [patron.Patron('a', 'b', 1, memberID) for memberID in (1, 2, 1, 3)]
+        self.db_interface.db.contains = Mock(side_effect=lambda memberID: memberID == 3)
+        self.db_interface.db.insert_many = Mock(return_value=[10, 11])
+        self.assertEqual(self.db_interface.insert_patrons(patrons), [10, 11, None, None])
+        self.db_interface.db.insert_many.assert_called_once_with(
+            [self.db_interface.convert_patron_to_db_format(p) for p in patrons[:2]])
+
+    def test_insert_patrons_none_new(self):
+        self.db_interface.db.contains = Mock(return_value=True)
+        self.db_interface.db.insert_many = Mock()
+        self.assertEqual(self.db_interface.insert_patrons([Mock(), None]), [None, None])
+        self.db_interface.db.insert_many.assert_not_called()
+
     def test_get_patron_count(self):
-        results_mock = MagicMock()
-        # get patron count returns lenght of results,
-        # so just setting length and mocking the "all" call that
-        # then has len() called on the results of
-        results_mock.__len__.return_value = 10
-        self.db_interface.db.all = Mock(return_value=results_mock)
+        # the count comes straight from the backend,
+        # so the documents themselves are never read
+        self.db_interface.db.count = Mock(return_value=10)
         self.assertEqual(self.db_interface.get_patron_count(), 10)
 
+    def test_iter_patrons(self):
+        self.db_interface.close_db()
+        self.db_interface.db = MagicMock()
+        self.db_interface.db.__iter__.return_value = iter(['a', 'b'])
+        self.assertEqual(list(self.db_interface.iter_patrons()), ['a', 'b'])
+
+    def test_get_patrons(self):
+        self.db_interface.iter_patrons = Mock(return_value=iter(range(10)))
+        self.assertEqual(self.db_interface.get_patrons(2, 3), [2, 3, 4])
+        self.db_interface.iter_patrons = Mock(return_value=iter(range(10)))
+        self.assertEqual(self.db_interface.get_patrons(8), [8, 9])
+
     def test_get_all_patrons(self):
         patron_mock = Mock()
         # mocking the outside api call that grabs patrons,
         # makes sure that the get_all_patrons returns what the api returns
-        self.db_interface.db.all = Mock(return_value=[patron_mock])        
+        self.db_interface.close_db()
+        self.db_interface.db = MagicMock()
+        self.db_interface.db.__iter__.return_value = iter([patron_mock])
         self.assertEqual(self.db_interface.get_all_patrons(), [patron_mock])
 
     def test_update_patron(self):
@@ -54,7 +85,7 @@ class TestLibbraryDBInterface(unittest.TestCase):
         db_update_mock = Mock()
         self.db_interface.db.update = db_update_mock
         self.db_interface.update_patron(Mock())
-        db_update_mock.assert_called()
+        db_update_mock.assert_called_with(data)
 
     def test_update_patron_false(self):
         patron_mock = MagicMock()
@@ -67,7 +98,7 @@ class TestLibbraryDBInterface(unittest.TestCase):
         # retrieving a patron and making sure the data is the same
         data = [{'fname': 'name', 'lname': 'name', 'age': '2', 'memberID': '3',
                 'borrowed_books': []}]
-        self.db_interface.db.search = Mock(return_value=data)
+        self.db_interface.db.get = Mock(return_value=data[0])
         mock_member_id = Mock()
         retrieved: patron.Patron = self.db_interface.retrieve_patron(mock_member_id)
 
@@ -85,7 +116,7 @@ class TestLibbraryDBInterface(unittest.TestCase):
         # effectively makes sure patron is constructed properly
         data = [{'fname': 'name', 'lname': 'name', 'age': '2', 'memberID': '3',
                 'borrowed_books': []}]
-        self.db_interface.db.search = Mock(return_value=data)
+        self.db_interface.db.get = Mock(return_value=data[0])
         mock_member_id = Mock()
         retrieved: patron.Patron = self.db_interface.retrieve_patron(mock_member_id)
 
@@ -97,12 +128,46 @@ class TestLibbraryDBInterface(unittest.TestCase):
 
 
 
+    #Retrieves a patron with borrowed books and verifies the books are restored
+    #without the names being validated again
+    def test_retrieve_patron_hydrated(self):
+        data = {'fname': 'name', 'lname': 'name', 'age': '2', 'memberID': '3',
+                'borrowed_books': ['book1']}
+        self.db_interface.db.get = Mock(return_value=data)
+        with unittest.mock.patch('library.patron.DIGIT') as digit:
+            retrieved = self.db_interface.retrieve_patron('3')
+        digit.search.assert_not_called()
+        self.assertEqual(retrieved.get_borrowed_books(), ['book1'])
+        retrieved.add_borrowed_book('book2')
+        self.assertEqual(data['borrowed_books'], ['book1'])
+
+    def test_iter_patrons_views(self):
+        data = {'fname': 'name', 'lname': 'name', 'age': '2', 'memberID': '3',
+                'borrowed_books': []}
+        self.db_interface.close_db()
+        self.db_interface.db = MagicMock()
+        self.db_interface.db.__iter__.return_value = iter([data])
+        views = self.db_interface.get_all_patrons(views=True)
+        self.assertIsInstance(views[0], patron.PatronView)
+        self.assertIs(views[0].to_record(), data)
+
     def test_retrieve_patron_false(self):
         # Making sure that if search returns False / None
         # this returns None
-        self.db_interface.db.search = Mock(return_value=False)
+        self.db_interface.db.get = Mock(return_value=None)
         self.assertIsNone(self.db_interface.retrieve_patron(Mock()))
 
+    def test_delete_patron(self):
+        self.db_interface.db.remove = Mock(return_value=True)
+        self.assertTrue(self.db_interface.delete_patron('3'))
+        self.db_interface.db.remove.assert_called_with('3')
+
+    def test_custom_backend(self):
+        backend = Mock()
+        db_interface = library_db_interface.Library_DB(backend=backend)
+        backend.count.return_value = 4
+        self.assertEqual(db_interface.get_patron_count(), 4)
+
     def test_convert_patron_to_db_format(self):
         patron_mock = Mock()
 
@@ -110,7 +175,112 @@ class TestLibbraryDBInterface(unittest.TestCase):
         patron_mock.get_lname = Mock(return_value=2)
         patron_mock.get_age = Mock(return_value=3)
         patron_mock.get_memberID = Mock(return_value=4)
-        patron_mock.get_borrowed_books = Mock(return_value=5)
-        self.assertEqual(self.db_interface.convert_patron_to_db_format(patron_mock),
-                         {'fname': 1, 'lname': 2, 'age': 3, 'memberID': 4,
-                          'borrowed_books': 5})
\ No newline at end of file
+        patron_mock.get_borrowed_books = Mock(return_value=[5])
+        record = self.db_interface.convert_patron_to_db_format(patron_mock)
+        self.assertEqual(record, {'fname': 1, 'lname': 2, 'age': 3, 'memberID': 4,
+                                  'borrowed_books': [5]})
+        self.assertIsNot(record['borrowed_books'], patron_mock.get_borrowed_books.return_value)
+
+class TestLibraryDBBackends(unittest.TestCase):
+    # runs the public Library_DB methods against every real backend
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def backends(self):
+        yield tinydb_backend.TinyDBBackend(os.path.join(self.dir.name, 'db.json'))
+        yield sqlite_backend.SQLiteBackend(os.path.join(self.dir.name, 'db.sqlite3'))
+        yield log_backend.LogBackend(os.path.join(self.dir.name, 'db.log'))
+        yield sharded_backend.ShardedBackend(os.path.join(self.dir.name, 'shards'), 4)
+
+    def test_round_trip(self):
+        for backend in self.backends():
+            with self.subTest(backend=type(backend).__name__):
+                db_interface = library_db_interface.Library_DB(backend=backend)
+                pat = patron.Patron('fname', 'lname', 20, 1234)
+                self.assertIsNotNone(db_interface.insert_patron(pat))
+                self.assertIsNone(db_interface.insert_patron(pat))
+                pat.add_borrowed_book('Book1')
+                db_interface.update_patron(pat)
+                self.assertEqual(db_interface.retrieve_patron(1234), pat)
+                self.assertEqual(db_interface.get_all_patrons(views=True), [pat])
+                self.assertEqual(db_interface.get_all_patrons(),
+                                 [{'fname': 'fname', 'lname': 'lname', 'age': 20, 'memberID': 1234,
+                                   'borrowed_books': ['book1']}])
+                self.assertEqual(db_interface.get_patron_count(), 1)
+                self.assertTrue(db_interface.delete_patron(1234))
+                self.assertIsNone(db_interface.retrieve_patron(1234))
+                db_interface.close_db()
+
+    #Changes a view after saving it and verifies the stored record is left as it was
+    def test_update_patron_view_not_shared(self):
+        for backend in self.backends():
+            with self.subTest(backend=type(backend).__name__):
+                db_interface = library_db_interface.Library_DB(backend=backend)
+                db_interface.insert_patron(patron.Patron('fname', 'lname', 20, 1))
+                view = db_interface.get_all_patrons(views=True)[0]
+                view.add_borrowed_book('x')
+                db_interface.update_patron(view)
+                view.add_borrowed_book('y')
+                view.get_borrowed_books().append('z')
+                self.assertEqual(db_interface.retrieve_patron(1).get_borrowed_books(), ['x'])
+                db_interface.close_db()
+
+    def test_insert_patrons(self):
+        for backend in self.backends():
+            with self.subTest(backend=type(backend).__name__):
+                db_interface = library_db_interface.Library_DB(backend=backend)
+                db_interface.insert_patron(patron.Patron('a', 'b', 1, 1))
+                ids = db_interface.insert_patrons([patron.Patron('a', 'b', 1, memberID)
+                                                   for memberID in (1, 2, 3, 2)])
+                self.assertEqual([id is not None for id in ids], [False, True, True, False])
+                self.assertEqual(sorted(doc['memberID'] for doc in db_interface.iter_patrons()), [1, 2, 3])
+                db_interface.close_db()
+
+    #Raises inside a transaction and verifies its inserts are gone
+    def test_transaction_rollback(self):
+        for backend in self.backends():
+            with self.subTest(backend=type(backend).__name__):
+                db_interface = library_db_interface.Library_DB(backend=backend)
+                db_interface.insert_patron(patron.Patron('a', 'b', 1, 1))
+                with self.assertRaises(ValueError):
+                    with db_interface.transaction():
+                        db_interface.insert_patron(patron.Patron('a', 'b', 1, 2))
+                        raise ValueError()
+                self.assertEqual(db_interface.get_patron_count(), 1)
+                self.assertIsNone(db_interface.retrieve_patron(2))
+                self.assertIsNotNone(db_interface.retrieve_patron(1))
+                db_interface.close_db()
+
+    def nested_transaction(self, db_interface, abort):
+        with db_interface.transaction():
+            db_interface.insert_patron(patron.Patron('a', 'b', 1, 1))
+            try:
+                with db_interface.transaction():
+                    db_interface.insert_patron(patron.Patron('a', 'b', 1, 2))
+                    raise ValueError()
+            except ValueError:
+                pass
+            db_interface.insert_patron(patron.Patron('a', 'b', 1, 3))
+            if abort:
+                raise KeyError()
+
+    #Catches an inner transaction's error and verifies the inner block joined the outer one
+    def test_nested_transaction(self):
+        for abort, expected in ((False, [1, 2, 3]), (True, [])):
+            for backend in self.backends():
+                with self.subTest(backend=type(backend).__name__, abort=abort):
+                    db_interface = library_db_interface.Library_DB(backend=backend)
+                    try:
+                        self.nested_transaction(db_interface, abort)
+                    except KeyError:
+                        pass
+                    self.assertEqual(sorted(doc['memberID'] for doc in db_interface.iter_patrons()),
+                                     expected)
+                    self.assertEqual(db_interface.get_patron_count(), len(expected))
+                    db_interface.close_db()
+            self.dir.cleanup()
+            self.dir = tempfile.TemporaryDirectory()
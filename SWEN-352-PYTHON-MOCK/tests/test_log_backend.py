@@ -0,0 +1,138 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import Mock
+from library import log_backend
+
+class TestLogBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'db.log')
+        self.backend = log_backend.LogBackend(self.path, compact_every=None)
+
+    def tearDown(self):
+        self.backend.close()
+        self.dir.cleanup()
+
+    def record(self, memberID, books=()):
+        return {'fname': 'a', 'lname': 'b', 'age': 1, 'memberID': memberID,
+                'borrowed_books': list(books)}
+
+    def reopen(self, **kwargs):
+        self.backend.close()
+        self.backend = log_backend.LogBackend(self.path, **kwargs)
+
+    def log_lines(self):
+        with open(self.path, 'rb') as f:
+            return f.readlines()
+
+    def test_replay(self):
+        self.backend.insert(self.record(1))
+        self.backend.insert(self.record(2))
+        self.backend.update(self.record(1, ['book1']))
+        self.backend.remove(2)
+        self.reopen()
+        self.assertEqual(list(self.backend), [self.record(1, ['book1'])])
+
+    def test_update_appends_one_line(self):
+        self.backend.insert(self.record(1))
+        self.backend.update(self.record(1, ['book1']))
+        self.assertEqual(len(self.log_lines()), 2)
+        self.assertFalse(self.backend.update(self.record(2)))
+        self.assertFalse(self.backend.remove(2))
+        self.assertEqual(len(self.log_lines()), 2)
+
+    def test_stored_records_are_copies(self):
+        record = self.record(1)
+        self.backend.insert(record)
+        record['borrowed_books'].append('book1')
+        self.backend.get(1)['borrowed_books'].append('book2')
+        self.assertEqual(self.backend.get(1), self.record(1))
+
+    #Cuts the last line short and verifies it is dropped and truncated away
+    def test_torn_tail(self):
+        self.backend.insert(self.record(1))
+        self.backend.insert(self.record(2))
+        self.backend.close()
+        with open(self.path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.path) - 5)
+        self.reopen()
+        self.assertEqual(self.backend.count(), 1)
+        self.assertEqual(len(self.log_lines()), 1)
+        self.backend.insert(self.record(3))
+        self.reopen()
+        self.assertEqual([record['memberID'] for record in self.backend], [1, 3])
+
+    def test_corrupt_record(self):
+        self.backend.insert(self.record(1))
+        self.backend.close()
+        with open(self.path, 'ab') as f:
+            f.write(b'00000000 ["p",{"memberID":2}]\n')
+        self.reopen()
+        self.assertEqual(self.backend.count(), 1)
+
+    def test_transaction_single_append(self):
+        self.backend.log.write = Mock(wraps=self.backend.log.write)
+        with self.backend.transaction():
+            self.backend.insert_many([self.record(memberID) for memberID in range(10)])
+            self.backend.remove(3)
+        self.backend.log.write.assert_called_once()
+        self.reopen()
+        self.assertEqual(self.backend.count(), 9)
+
+    def test_transaction_rollback(self):
+        self.backend.insert(self.record(1))
+        self.backend.insert(self.record(2))
+        with self.assertRaises(ValueError):
+            with self.backend.transaction():
+                self.backend.update(self.record(1, ['book1']))
+                self.backend.remove(2)
+                self.backend.insert(self.record(3))
+                raise ValueError()
+        self.assertEqual(list(self.backend), [self.record(1), self.record(2)])
+        self.assertEqual(len(self.log_lines()), 2)
+
+    def test_compact(self):
+        for memberID in range(5):
+            self.backend.insert(self.record(memberID))
+        self.backend.remove(0)
+        self.backend.compact(wait=True)
+        self.assertEqual(self.log_lines(), [])
+        self.assertFalse(os.path.exists(self.path + '.compacting'))
+        self.backend.insert(self.record(5))
+        self.reopen()
+        self.assertEqual([record['memberID'] for record in self.backend], [1, 2, 3, 4, 5])
+
+    def test_compacts_in_background(self):
+        self.reopen(compact_every=3)
+        for memberID in range(4):
+            self.backend.insert(self.record(memberID))
+        self.backend.compactor.join()
+        self.assertEqual(len(self.log_lines()), 1)
+        self.reopen()
+        self.assertEqual(self.backend.count(), 4)
+
+    #Leaves a compaction half done and verifies nothing is lost on open
+    def test_interrupted_compaction(self):
+        self.backend.insert(self.record(1))
+        self.backend.write_snapshot = Mock()
+        self.backend.compact(wait=True)
+        self.backend.insert(self.record(2))
+        self.reopen()
+        self.assertEqual(self.backend.count(), 2)
+        self.assertFalse(os.path.exists(self.path + '.compacting'))
+        self.assertEqual(self.log_lines(), [])
+        self.reopen()
+        self.assertEqual(self.backend.count(), 2)
+
+    def test_compact_after_failed_snapshot(self):
+        self.backend.insert(self.record(1))
+        self.backend.write_snapshot = Mock()
+        self.backend.compact(wait=True)
+        self.backend.insert(self.record(2))
+        del self.backend.write_snapshot
+        self.backend.compact(wait=True)
+        self.assertFalse(os.path.exists(self.path + '.compacting'))
+        self.reopen()
+        self.assertEqual(self.backend.count(), 2)
@@ -0,0 +1,103 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+from library import migrate, tinydb_backend, sqlite_backend, sharded_backend
+
+class TestMigrate(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.dir.name, 'db.json')
+        self.sqlite_path = os.path.join(self.dir.name, 'db.sqlite3')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def record(self, memberID):
+        return {'fname': 'a', 'lname': 'b', 'age': 1, 'memberID': memberID,
+                'borrowed_books': ['book%d' % memberID]}
+
+    def test_migrate(self):
+        source = tinydb_backend.TinyDBBackend(self.json_path)
+        for memberID in range(5):
+            source.insert(self.record(memberID))
+        target = sqlite_backend.SQLiteBackend(self.sqlite_path)
+        target.insert(dict(self.record(0), fname='old'))
+        self.assertEqual(migrate.migrate(source, target), 5)
+        self.assertEqual(list(target), list(source))
+        source.close()
+        target.close()
+
+    #Fails partway through and verifies the target keeps nothing
+    def test_migrate_all_or_nothing(self):
+        source = MagicMock()
+        source.__iter__.return_value = iter([self.record(1), None])
+        target = sqlite_backend.SQLiteBackend(self.sqlite_path)
+        with self.assertRaises(TypeError):
+            migrate.migrate(source, target)
+        self.assertEqual(target.count(), 0)
+        target.close()
+
+    def test_main(self):
+        source = tinydb_backend.TinyDBBackend(self.json_path)
+        source.insert(self.record(1))
+        source.close()
+        self.assertEqual(migrate.main(['migrate', self.json_path, self.sqlite_path]), 0)
+        target = sqlite_backend.SQLiteBackend(self.sqlite_path)
+        self.assertEqual(target.get(1), self.record(1))
+        target.close()
+
+    def test_main_usage(self):
+        self.assertEqual(migrate.main(['migrate']), 2)
+
+    #Reshards four shards into seven and verifies every patron is found in its new shard
+    def test_reshard(self):
+        path = os.path.join(self.dir.name, 'shards')
+        source = sharded_backend.ShardedBackend(path, 4)
+        source.insert_many([self.record(memberID) for memberID in range(40)])
+        source.close()
+        self.assertEqual(migrate.reshard(path, 7), 40)
+        self.assertEqual(sorted(os.listdir(self.dir.name)), ['shards'])
+        target = sharded_backend.ShardedBackend(path)
+        self.assertEqual(len(target.shards), 7)
+        self.assertEqual(target.count(), 40)
+        self.assertEqual([target.get(memberID) for memberID in range(40)],
+                         [self.record(memberID) for memberID in range(40)])
+        target.close()
+
+    def test_reshard_stale_old_directory(self):
+        path = os.path.join(self.dir.name, 'shards')
+        sharded_backend.ShardedBackend(path, 2).close()
+        os.makedirs(path + '.old')
+        self.assertEqual(migrate.reshard(path, 3), 0)
+        self.assertEqual(sorted(os.listdir(self.dir.name)), ['shards'])
+
+    #Crashes between moving the old shards away and moving the new ones in,
+    #and verifies recovery finishes the reshard
+    def test_recover_interrupted_reshard(self):
+        path = os.path.join(self.dir.name, 'shards')
+        source = sharded_backend.ShardedBackend(path, 2)
+        source.insert_many([self.record(memberID) for memberID in range(10)])
+        source.close()
+        replace = os.replace
+        def crash_on_swap(src, dst):
+            if src == path + '.reshard':
+                raise OSError("crashed")
+            replace(src, dst)
+        with patch('os.replace', side_effect=crash_on_swap):
+            with self.assertRaises(OSError):
+                migrate.reshard(path, 3)
+        self.assertFalse(os.path.exists(path))
+        migrate.recover_reshard(path)
+        self.assertEqual(sorted(os.listdir(self.dir.name)), ['shards'])
+        target = sharded_backend.ShardedBackend(path)
+        self.assertEqual(len(target.shards), 3)
+        self.assertEqual(target.count(), 10)
+        target.close()
+
+    def test_main_reshard(self):
+        path = os.path.join(self.dir.name, 'shards')
+        sharded_backend.ShardedBackend(path, 2).close()
+        self.assertEqual(migrate.main(['migrate', 'reshard', path, '3']), 0)
+        self.assertEqual(len(sharded_backend.ShardedBackend(path).shards), 3)
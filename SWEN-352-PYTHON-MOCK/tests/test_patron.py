@@ -24,4 +24,125 @@ class TestPatron(unittest.TestCase):
     def test_not_equal(self):
         pat2 = patron.Patron('Jimmy', 'Bob', '93', '1235')
         self.assertNotEqual(self.pat, pat2)
-        
\ No newline at end of file
+        
+class TestPatronView(unittest.TestCase):
+
+    def setUp(self):
+        self.record = {'fname': 'fname', 'lname': 'lname', 'age': '20', 'memberID': '1234',
+                       'borrowed_books': ['book1']}
+        self.view = patron.PatronView(self.record)
+
+    def test_from_record(self):
+        pat = patron.Patron.from_record(self.record)
+        expected = patron.Patron('fname', 'lname', '20', '1234')
+        expected.add_borrowed_book('Book1')
+        self.assertEqual(pat, expected)
+        self.assertIsNot(pat.get_borrowed_books(), self.record['borrowed_books'])
+
+    def test_reads_record(self):
+        self.assertEqual(self.view.get_fname(), 'fname')
+        self.assertEqual(self.view.lname, 'lname')
+        self.assertEqual(self.view['memberID'], '1234')
+        self.assertEqual(self.view.get_borrowed_books(), self.record['borrowed_books'])
+        self.assertIsNot(self.view.get_borrowed_books(), self.record['borrowed_books'])
+        self.assertIs(self.view.to_record(), self.record)
+
+    #Changes a view and verifies the stored record is left as it was
+    def test_copy_on_write(self):
+        self.view.add_borrowed_book('Book2')
+        self.view.return_borrowed_book('Book1')
+        self.view.age = '21'
+        self.assertEqual(self.view.get_borrowed_books(), ['book2'])
+        self.assertEqual(self.view.get_age(), '21')
+        self.assertEqual(self.record['borrowed_books'], ['book1'])
+        self.assertEqual(self.record['age'], '20')
+
+    def test_no_copy_without_change(self):
+        self.view.add_borrowed_book('Book1')
+        self.view.return_borrowed_book('Book2')
+        self.assertIs(self.view.to_record(), self.record)
+
+    def test_equal(self):
+        pat = self.view.to_patron()
+        self.assertEqual(self.view, pat)
+        self.assertEqual(self.view, patron.PatronView(dict(self.record)))
+        pat.add_borrowed_book('Book2')
+        self.assertNotEqual(self.view, pat)
+
+    def test_not_equal_to_other_types(self):
+        self.assertNotEqual(self.view, None)
+        self.assertNotEqual(self.view, 5)
+        self.assertIn(self.view, [None, self.view.to_patron()])
+
+class TestCompactPatron(unittest.TestCase):
+
+    def setUp(self):
+        self.pat = patron.Patron('fname', 'lname', '20', '1234')
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.pat, '__dict__'))
+
+    def test_interned_names(self):
+        other = patron.Patron(''.join(['fna', 'me']), 'lname', '21', '1235')
+        self.assertIs(other.get_fname(), self.pat.get_fname())
+
+    #Borrows books out of order and verifies they keep the order they were borrowed in
+    def test_borrowed_books_ordered(self):
+        for book in ('Book3', 'Book1', 'Book2', 'BOOK3'):
+            self.pat.add_borrowed_book(book)
+        self.pat.return_borrowed_book('book1')
+        self.pat.return_borrowed_book('book9')
+        self.assertEqual(self.pat.get_borrowed_books(), ['book3', 'book2'])
+        self.assertEqual(self.pat.borrowed_books, ['book3', 'book2'])
+        self.assertTrue(self.pat.has_borrowed_book('Book2'))
+        self.assertFalse(self.pat.has_borrowed_book('Book1'))
+
+    def test_borrowed_books_is_a_copy(self):
+        self.pat.get_borrowed_books().append('book1')
+        self.pat.borrowed_books.append('book1')
+        self.assertEqual(self.pat.get_borrowed_books(), [])
+
+    def test_equal_to_dict_holder(self):
+        self.pat.add_borrowed_book('Book1')
+        other = type('Holder', (), {})()
+        other.__dict__.update({'fname': 'fname', 'lname': 'lname', 'age': '20',
+                               'memberID': '1234', 'borrowed_books': ['book1']})
+        self.assertEqual(self.pat, other)
+        other.borrowed_books = []
+        self.assertNotEqual(self.pat, other)
+
+class TestValidateMany(unittest.TestCase):
+
+    def record(self, fname, lname='lname', memberID=1):
+        return {'fname': fname, 'lname': lname, 'age': 20, 'memberID': memberID,
+                'borrowed_books': []}
+
+    def test_all_valid(self):
+        records = [self.record('fname', memberID=i) for i in range(5)]
+        self.assertEqual(patron.Patron.validate_many(records), (records, []))
+
+    #Puts digits in first and last names around empty names and verifies
+    #each match is traced back to the right record
+    def test_rejections(self):
+        records = [self.record('a'), self.record('', '2b'), self.record('c'),
+                   self.record('d4', 'e5'), self.record(''), self.record('f', 6),
+                   self.record('9')]
+        valid, rejected = patron.Patron.validate_many(records)
+        self.assertEqual(valid, [records[0], records[2], records[4]])
+        self.assertEqual(rejected, [(1, "Name should not contain numbers"),
+                                    (3, "Name should not contain numbers"),
+                                    (5, "Name should be text"),
+                                    (6, "Name should not contain numbers")])
+
+    def test_from_records(self):
+        patrons, rejected = patron.Patron.from_records(iter([self.record('fname'),
+                                                             self.record('f1')]))
+        self.assertEqual(patrons, [patron.Patron('fname', 'lname', 20, 1)])
+        self.assertEqual([position for position, reason in rejected], [1])
+
+    def test_from_records_missing_field(self):
+        incomplete = self.record('fname')
+        del incomplete['memberID']
+        patrons, rejected = patron.Patron.from_records([incomplete, self.record('fname')])
+        self.assertEqual(patrons, [patron.Patron('fname', 'lname', 20, 1)])
+        self.assertEqual(rejected, [(0, "Missing memberID")])
@@ -0,0 +1,115 @@
+import unittest
+import os
+import json
+import tempfile
+from unittest.mock import Mock, MagicMock
+from library import patron_io, library_db_interface
+from library.patron import Patron
+
+class TestParseRow(unittest.TestCase):
+
+    def test_parse_row(self):
+        record = patron_io.parse_row({'fname': 'Ann', 'lname': 'Lee', 'age': '30',
+                                      'memberID': '7', 'borrowed_books': '["Book1"]'})
+        self.assertEqual(record, {'fname': 'Ann', 'lname': 'Lee', 'age': 30, 'memberID': 7,
+                                  'borrowed_books': ['book1']})
+
+    def test_parse_row_keeps_text_memberID(self):
+        record = patron_io.parse_row({'fname': 'Ann', 'lname': 'Lee', 'age': 30,
+                                      'memberID': 'A7', 'borrowed_books': ['book1']})
+        self.assertEqual(record['memberID'], 'A7')
+        self.assertEqual(record['borrowed_books'], ['book1'])
+
+    def test_parse_row_missing(self):
+        with self.assertRaisesRegex(ValueError, 'Missing age, memberID'):
+            patron_io.parse_row({'fname': 'Ann', 'lname': 'Lee', 'age': ''})
+
+    def test_parse_row_bad_age(self):
+        with self.assertRaises(ValueError):
+            patron_io.parse_row({'fname': 'Ann', 'lname': 'Lee', 'age': 'x', 'memberID': 1})
+
+    def test_parse_row_not_object(self):
+        with self.assertRaises(ValueError):
+            patron_io.parse_row(None)
+
+    #Passes books and memberIDs of the wrong type and verifies each is a ValueError
+    def test_parse_row_bad_types(self):
+        row = {'fname': 'Ann', 'lname': 'Lee', 'age': 30, 'memberID': 1}
+        for bad in [{'borrowed_books': 5}, {'borrowed_books': [1]}, {'borrowed_books': 'abc'},
+                    {'borrowed_books': '{"a": 1}'}, {'memberID': [3]}, {'memberID': 1.5}]:
+            with self.subTest(bad=bad):
+                with self.assertRaises(ValueError):
+                    patron_io.parse_row(dict(row, **bad))
+
+class TestImportPatrons(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.db.insert_patrons = Mock(side_effect=lambda patrons: [
+            None if p.get_memberID() == 2 else p.get_memberID() for p in patrons])
+
+    def row(self, memberID, fname='Ann'):
+        return {'fname': fname, 'lname': 'Lee', 'age': 30, 'memberID': memberID}
+
+    #Imports good, malformed and duplicate rows and verifies the rejection report
+    def test_import_patrons(self):
+        rows = [(1, self.row(1)), (2, self.row(2)), (3, self.row(3, 'Ann1')),
+                (4, None), (5, self.row(4))]
+        inserted, rejections = patron_io.import_patrons(self.db, rows)
+        self.assertEqual(inserted, 2)
+        self.assertEqual(rejections, [
+            patron_io.Rejection(2, 2, "Duplicate memberID"),
+            patron_io.Rejection(3, 3, "Name should not contain numbers"),
+            patron_io.Rejection(4, None, "Row is not an object")])
+        self.db.transaction.assert_called_once_with()
+
+    def test_import_patrons_batches(self):
+        rows = [(memberID, self.row(memberID)) for memberID in range(5, 10)]
+        inserted, rejections = patron_io.import_patrons(self.db, rows, batch_size=2)
+        self.assertEqual(inserted, 5)
+        self.assertEqual([len(call.args[0]) for call in self.db.insert_patrons.call_args_list],
+                         [2, 2, 1])
+
+class TestPatronFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = library_db_interface.Library_DB(os.path.join(self.dir.name, 'db.json'))
+
+    def tearDown(self):
+        self.db.close_db()
+        self.dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def test_import_csv(self):
+        with open(self.path('in.csv'), 'w') as f:
+            f.write('fname,lname,age,memberID\nAnn,Lee,30,1\nBo,Lee,x,2\nAnn,Lee,30,1\n')
+        inserted, rejections = patron_io.import_csv(self.db, self.path('in.csv'))
+        self.assertEqual(inserted, 1)
+        self.assertEqual([(r.line, r.memberID) for r in rejections], [(3, '2'), (4, 1)])
+        self.assertEqual(self.db.retrieve_patron(1), Patron('Ann', 'Lee', 30, 1))
+
+    def test_import_jsonl(self):
+        with open(self.path('in.jsonl'), 'w') as f:
+            f.write(json.dumps({'fname': 'Ann', 'lname': 'Lee', 'age': 30, 'memberID': 1}) + '\n')
+            f.write('\n{not json\n')
+        inserted, rejections = patron_io.import_jsonl(self.db, self.path('in.jsonl'))
+        self.assertEqual(inserted, 1)
+        self.assertEqual([r.line for r in rejections], [3])
+
+    #Exports to both formats and verifies each imports back to the same database
+    def test_export_round_trip(self):
+        patron = Patron('Ann', 'Lee', 30, 1)
+        patron.add_borrowed_book('Book1')
+        self.db.insert_patrons([patron, Patron('Bo', 'Lee', 20, 'A2')])
+        for export, read in ((patron_io.export_csv, patron_io.read_csv),
+                             (patron_io.export_jsonl, patron_io.read_jsonl)):
+            with self.subTest(export=export.__name__):
+                path = self.path(export.__name__)
+                self.assertEqual(export(self.db, path), 2)
+                other = library_db_interface.Library_DB(self.path(export.__name__ + '.json'))
+                self.assertEqual(patron_io.import_patrons(other, read(path)), (2, []))
+                self.assertEqual(other.get_all_patrons(), self.db.get_all_patrons())
+                other.close_db()
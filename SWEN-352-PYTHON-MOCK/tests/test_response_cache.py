@@ -0,0 +1,62 @@
+import unittest
+from library import response_cache
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = response_cache.ResponseCache(ttl=10, max_entries=3, max_bytes=100,
+                                                  clock=lambda: self.now)
+
+    def test_get_miss(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_get_hit(self):
+        self.cache.put('a', {'docs': []}, 10)
+        self.assertEqual(self.cache.get('a'), {'docs': []})
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_ttl_expiry(self):
+        self.cache.put('a', 1, 10)
+        self.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_stale_read(self):
+        self.cache.put('a', 1, 10)
+        self.now = 10
+        self.assertEqual(self.cache.get('a', stale=True), 1)
+
+    #Fills past max_entries and verifies the least recently used entry is dropped
+    def test_evict_by_count(self):
+        self.cache.put('a', 1, 1)
+        self.cache.put('b', 2, 1)
+        self.cache.put('c', 3, 1)
+        self.cache.get('a')
+        self.cache.put('d', 4, 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_evict_by_size(self):
+        self.cache.put('a', 1, 60)
+        self.cache.put('b', 2, 60)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['bytes'], 60)
+
+    def test_too_large_not_cached(self):
+        self.cache.put('a', 1, 101)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_replace_entry(self):
+        self.cache.put('a', 1, 40)
+        self.cache.put('a', 2, 50)
+        self.assertEqual(self.cache.get('a'), 2)
+        self.assertEqual(self.cache.stats()['bytes'], 50)
+
+    def test_clear(self):
+        self.cache.put('a', 1, 10)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertEqual(self.cache.stats()['bytes'], 0)
@@ -0,0 +1,50 @@
+import unittest
+import os
+import tempfile
+from library import response_store
+
+class TestResponseStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'responses')
+        with open('tests_data/json_data.txt', 'rb') as f:
+            self.body = f.read()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_record_then_replay(self):
+        with response_store.ResponseStore(self.path, response_store.ResponseStore.RECORD) as store:
+            store.put('url', self.body)
+        with response_store.ResponseStore(self.path) as store:
+            self.assertEqual(store.get('url'), self.body)
+            self.assertIn('url', store)
+
+    def test_compressed_on_disk(self):
+        with response_store.ResponseStore(self.path, response_store.ResponseStore.RECORD) as store:
+            store.put('url', self.body)
+        self.assertLess(os.path.getsize(self.path + '.dat'), len(self.body) / 4)
+
+    def test_replay_missing(self):
+        with response_store.ResponseStore(self.path) as store:
+            self.assertIsNone(store.get('url'))
+
+    #Records in two sessions and verifies the second one adds to the first
+    def test_record_appends(self):
+        with response_store.ResponseStore(self.path, response_store.ResponseStore.RECORD) as store:
+            store.put('one', b'1')
+        with response_store.ResponseStore(self.path, response_store.ResponseStore.RECORD) as store:
+            store.put('two', b'2')
+            store.put('one', b'3')
+        with response_store.ResponseStore(self.path) as store:
+            self.assertEqual(len(store), 2)
+            self.assertEqual(store.get('one'), b'3')
+            self.assertEqual(store.get('two'), b'2')
+
+    def test_put_while_replaying(self):
+        with response_store.ResponseStore(self.path) as store:
+            self.assertRaises(ValueError, store.put, 'url', b'1')
+
+    def test_invalid_mode(self):
+        self.assertRaises(ValueError, response_store.ResponseStore, self.path, 'write')
@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import patch
+from library import search_result
+from library.ext_api_interface import BookRecord
+
+class TestBookPage(unittest.TestCase):
+
+    #Reads the normalized titles twice and verifies they are only computed once
+    def test_normalized_titles_cached(self):
+        page = search_result.BookPage([BookRecord(title='Learning  Python!'),
+                                       BookRecord(title=None)])
+        with patch('library.search_result.normalize_title',
+                   side_effect=search_result.normalize_title) as normalize:
+            self.assertEqual(page.normalized_titles('title'), ['learning python', ''])
+            self.assertEqual(page.normalized_titles('title'), ['learning python', ''])
+        self.assertEqual(normalize.call_count, 2)
+
+class TestSearchResult(unittest.TestCase):
+
+    def setUp(self):
+        self.ebooks = search_result.SearchResult()
+        self.ebooks.add_ebooks(search_result.BookPage([
+            BookRecord(title='Learning Python', ebook_count_i=3),
+            BookRecord(title='Learning Python (Learning)', ebook_count_i=1),
+            BookRecord(title='learning python', ebook_count_i=1),
+            BookRecord(title='Python Basics', ebook_count_i=0)]))
+
+    def test_add_ebooks(self):
+        self.assertEqual(self.ebooks, [{'title': 'Learning Python', 'ebook_count': 3},
+                                       {'title': 'Learning Python (Learning)', 'ebook_count': 1},
+                                       {'title': 'learning python', 'ebook_count': 1}])
+
+    def test_has_title_normalized(self):
+        self.assertTrue(self.ebooks.has_title('  LEARNING python '))
+        self.assertTrue(self.ebooks.has_title('Learning Python: Learning'))
+        self.assertFalse(self.ebooks.has_title('Python Basics'))
+
+    def test_ebook_count(self):
+        self.assertEqual(self.ebooks.ebook_count(), 5)
+        self.assertEqual(self.ebooks.ebook_count('Learning Python'), 4)
+        self.assertEqual(self.ebooks.ebook_count('Dune'), 0)
+
+    def test_add_titles(self):
+        titles = search_result.SearchResult()
+        titles.add_titles([BookRecord(title_suggest='Dune'), BookRecord(title_suggest='Emma')])
+        self.assertEqual(titles, ['Dune', 'Emma'])
+        self.assertTrue(titles.has_title('dune'))
+
+    def test_of(self):
+        self.assertIs(search_result.SearchResult.of(self.ebooks), self.ebooks)
+        titles = search_result.SearchResult.of(['Dune', 'Emma'])
+        self.assertTrue(titles.has_title('EMMA'))
+        ebooks = search_result.SearchResult.of([{'title': 'Dune', 'ebook_count': 2}])
+        self.assertEqual(ebooks.ebook_count('dune'), 2)
@@ -0,0 +1,92 @@
+import unittest
+import os
+import threading
+import tempfile
+from unittest.mock import Mock
+from library import sharded_backend, sqlite_backend
+
+class TestShardedBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'shards')
+        self.backend = sharded_backend.ShardedBackend(self.path, 4)
+
+    def tearDown(self):
+        self.backend.close()
+        self.dir.cleanup()
+
+    def record(self, memberID):
+        return {'fname': 'a', 'lname': 'b', 'age': 1, 'memberID': memberID, 'borrowed_books': []}
+
+    def test_shard_of(self):
+        self.assertEqual(sharded_backend.shard_of(1234, 4), sharded_backend.shard_of('1234', 4))
+        self.assertEqual({sharded_backend.shard_of(memberID, 4) for memberID in range(100)},
+                         {0, 1, 2, 3})
+
+    #Inserts one patron and verifies only its shard was opened and written
+    def test_write_touches_one_shard(self):
+        self.assertEqual(self.backend.insert(self.record(7)),
+                         (sharded_backend.shard_of(7, 4), 1))
+        self.assertEqual(len(self.backend.loaded()), 1)
+        self.assertEqual(os.listdir(self.path).count('shard-%03d.json' % sharded_backend.shard_of(7, 4)), 1)
+        self.assertEqual(self.backend.get(7), self.record(7))
+        self.assertEqual(len(self.backend.loaded()), 1)
+
+    def test_count_and_iterate(self):
+        self.backend.max_workers = 4
+        ids = self.backend.insert_many([self.record(memberID) for memberID in range(50)])
+        self.assertEqual(len(set(ids)), 50)
+        self.assertEqual(self.backend.count(), 50)
+        self.assertEqual(sorted(record['memberID'] for record in self.backend), list(range(50)))
+        with self.backend.transaction():
+            self.backend.insert(self.record(50))
+            self.assertEqual(self.backend.count(), 51)
+
+    #Reopens the shards and verifies count opens them on the worker threads
+    def test_count_opens_shards_in_workers(self):
+        self.backend.insert_many([self.record(memberID) for memberID in range(20)])
+        self.backend.close()
+        self.backend = sharded_backend.ShardedBackend(self.path, max_workers=4)
+        threads = set()
+        backend_cls = self.backend.backend_cls
+        def open_on_thread(path):
+            threads.add(threading.get_ident())
+            return backend_cls(path)
+        self.backend.backend_cls = open_on_thread
+        self.assertEqual(self.backend.count(), 20)
+        self.assertEqual(len(self.backend.loaded()), 4)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_transaction_rollback(self):
+        self.backend.insert(self.record(1))
+        with self.assertRaises(ValueError):
+            with self.backend.transaction():
+                for memberID in range(2, 20):
+                    self.backend.insert(self.record(memberID))
+                self.backend.remove(1)
+                raise ValueError()
+        self.assertEqual(self.backend.count(), 1)
+        self.assertTrue(self.backend.contains(1))
+
+    def test_manifest(self):
+        self.backend.insert(self.record(1))
+        self.backend.close()
+        with self.assertRaises(ValueError):
+            sharded_backend.ShardedBackend(self.path, 8)
+        self.backend = sharded_backend.ShardedBackend(self.path)
+        self.assertEqual(len(self.backend.shards), 4)
+        self.assertEqual(self.backend.get(1), self.record(1))
+
+    def test_other_backend(self):
+        self.backend.close()
+        self.backend = sharded_backend.ShardedBackend(os.path.join(self.dir.name, 'sqlite'), 2,
+                                                      sqlite_backend.SQLiteBackend, '.sqlite3')
+        self.backend.insert(self.record(1))
+        self.assertTrue(os.path.exists(self.backend.shard_path(sharded_backend.shard_of(1, 2))))
+        self.assertEqual(self.backend.count(), 1)
+
+    def test_close_only_loaded(self):
+        self.backend.shards[2] = Mock()
+        self.backend.close()
+        self.backend.shards[2].close.assert_called_once_with()
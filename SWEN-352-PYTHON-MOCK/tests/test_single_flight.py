@@ -0,0 +1,91 @@
+import unittest
+import asyncio
+import threading
+import time
+from unittest.mock import Mock
+from library import single_flight
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = single_flight.SingleFlight()
+        self.release = threading.Event()
+
+    def wait_for_coalesced(self, count):
+        deadline = time.monotonic() + 5
+        while self.flight.coalesced < count and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    # starts one thread per caller and collects what each one gets back
+    def run_callers(self, count, function):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.flight.do('key', function)))
+                   for i in range(count)]
+        for thread in threads:
+            thread.start()
+        self.wait_for_coalesced(count - 1)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    #Runs five callers at once and verifies only one call is made
+    def test_concurrent_calls_coalesced(self):
+        function = Mock(side_effect=lambda: self.release.wait() and 'result')
+        results = self.run_callers(5, function)
+        self.assertEqual(results, ['result'] * 5)
+        self.assertEqual(function.call_count, 1)
+        self.assertEqual(self.flight.coalesced, 4)
+
+    def test_sequential_calls_not_coalesced(self):
+        function = Mock(return_value='result')
+        self.flight.do('key', function)
+        self.flight.do('key', function)
+        self.assertEqual(function.call_count, 2)
+        self.assertEqual(self.flight.coalesced, 0)
+
+    def test_error_shared(self):
+        def function():
+            self.release.wait()
+            raise ValueError()
+        errors = []
+        def caller():
+            try:
+                self.flight.do('key', function)
+            except ValueError:
+                errors.append(True)
+        threads = [threading.Thread(target=caller) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        self.wait_for_coalesced(2)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [True] * 3)
+        self.assertEqual(self.flight.flights, {})
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_calls_coalesced(self):
+        flight = single_flight.AsyncSingleFlight()
+        calls = []
+        async def function():
+            calls.append(True)
+            await asyncio.sleep(0.01)
+            return 'result'
+        results = await asyncio.gather(*[flight.do('key', function) for i in range(5)])
+        self.assertEqual(results, ['result'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.coalesced, 4)
+        self.assertEqual(flight.flights, {})
+
+    async def test_cancelled_waiter_keeps_call(self):
+        flight = single_flight.AsyncSingleFlight()
+        async def function():
+            await asyncio.sleep(0.01)
+            return 'result'
+        first = asyncio.ensure_future(flight.do('key', function))
+        second = asyncio.ensure_future(flight.do('key', function))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, 'result')
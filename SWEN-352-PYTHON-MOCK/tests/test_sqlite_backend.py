@@ -0,0 +1,57 @@
+import unittest
+import os
+import tempfile
+from library import sqlite_backend
+
+class TestSQLiteBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'db.sqlite3')
+        self.backend = sqlite_backend.SQLiteBackend(self.path)
+        self.record = {'fname': 'a', 'lname': 'b', 'age': 1, 'memberID': 3,
+                       'borrowed_books': ['book1']}
+
+    def tearDown(self):
+        self.backend.close()
+        self.dir.cleanup()
+
+    def test_wal_mode(self):
+        mode = self.backend.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_memberID_indexed(self):
+        plan = self.backend.conn.execute("EXPLAIN QUERY PLAN " + self.backend.SELECT, (3,)).fetchall()
+        self.assertIn('USING INDEX', plan[0][-1])
+
+    def test_insert_get(self):
+        self.backend.insert(self.record)
+        self.assertEqual(self.backend.get(3), self.record)
+        self.assertIsNone(self.backend.get('3'))
+        self.assertTrue(self.backend.contains(3))
+
+    def test_update(self):
+        self.backend.insert(self.record)
+        self.assertTrue(self.backend.update(dict(self.record, borrowed_books=[])))
+        self.assertEqual(self.backend.get(3)['borrowed_books'], [])
+        self.assertFalse(self.backend.update(dict(self.record, memberID=4)))
+
+    def test_remove(self):
+        self.backend.insert(self.record)
+        self.assertTrue(self.backend.remove(3))
+        self.assertFalse(self.backend.remove(3))
+        self.assertEqual(self.backend.count(), 0)
+
+    #Iterates past one page and verifies every record comes back in order
+    def test_iterate_pages(self):
+        self.backend.PAGE_SIZE = 3
+        with self.backend.transaction():
+            for memberID in range(7):
+                self.backend.insert(dict(self.record, memberID=memberID))
+        self.assertEqual([record['memberID'] for record in self.backend], list(range(7)))
+
+    def test_persisted(self):
+        self.backend.insert(self.record)
+        self.backend.close()
+        self.backend = sqlite_backend.SQLiteBackend(self.path)
+        self.assertEqual(self.backend.count(), 1)
@@ -0,0 +1,135 @@
+import unittest
+import json
+import os
+import fcntl
+import tempfile
+from unittest.mock import Mock, patch
+from tinydb.storages import MemoryStorage
+from library import storage
+
+class TestWriteBehindMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.middleware = storage.WriteBehindMiddleware(MemoryStorage, flush_every=3,
+                                                        flush_interval=10,
+                                                        clock=lambda: self.now)()
+        self.middleware.storage.write = Mock(wraps=self.middleware.storage.write)
+
+    def test_buffers_until_count(self):
+        self.middleware.write({'n': 1})
+        self.middleware.write({'n': 2})
+        self.middleware.storage.write.assert_not_called()
+        self.middleware.write({'n': 3})
+        self.middleware.storage.write.assert_called_once_with({'n': 3})
+
+    def test_flushes_after_interval(self):
+        self.middleware.write({'n': 1})
+        self.now = 10
+        self.middleware.write({'n': 2})
+        self.middleware.storage.write.assert_called_once_with({'n': 2})
+
+    def test_read_served_from_memory(self):
+        self.middleware.write({'n': 1})
+        self.assertEqual(self.middleware.read(), {'n': 1})
+
+    def test_close_flushes(self):
+        self.middleware.write({'n': 1})
+        self.middleware.close()
+        self.middleware.storage.write.assert_called_once_with({'n': 1})
+
+    #Writes more than flush_every times inside a transaction and verifies one write at commit
+    def test_transaction_single_write(self):
+        self.middleware.begin()
+        for n in range(5):
+            self.middleware.write({'n': n})
+        self.middleware.storage.write.assert_not_called()
+        self.middleware.commit()
+        self.middleware.storage.write.assert_called_once_with({'n': 4})
+
+    def test_rollback(self):
+        self.middleware.write({'n': 1})
+        self.middleware.begin()
+        self.middleware.write({'n': 2})
+        self.middleware.rollback()
+        self.assertEqual(self.middleware.read(), {'n': 1})
+
+    def test_inner_rollback_joins_outer(self):
+        self.middleware.begin()
+        self.middleware.write({'n': 1})
+        self.middleware.begin()
+        self.middleware.write({'n': 2})
+        self.middleware.rollback()
+        self.assertEqual(self.middleware.depth, 1)
+        self.assertEqual(self.middleware.read(), {'n': 2})
+        self.middleware.commit()
+        self.middleware.storage.write.assert_called_once_with({'n': 2})
+
+class TestDurableJSONStorage(unittest.TestCase):
+
+    def test_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'db.json')
+            json_storage = storage.DurableJSONStorage(path, fsync=True)
+            json_storage.write({'_default': {'1': {'a': 'long value'}}})
+            json_storage.write({'_default': {}})
+            json_storage.close()
+            with open(path) as f:
+                self.assertEqual(json.load(f), {'_default': {}})
+
+    #Fails a write before the file is replaced and verifies the old data is intact
+    def test_failed_write_keeps_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'db.json')
+            json_storage = storage.DurableJSONStorage(path)
+            json_storage.write({'_default': {'1': {'a': 1}}})
+            with patch('os.replace', side_effect=OSError):
+                with self.assertRaises(OSError):
+                    json_storage.write({'_default': {}})
+            self.assertEqual(json_storage.read(), {'_default': {'1': {'a': 1}}})
+            json_storage.close()
+
+    def test_read_after_other_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'db.json')
+            reader = storage.DurableJSONStorage(path)
+            writer = storage.DurableJSONStorage(path)
+            writer.write({'_default': {'1': {'a': 1}}})
+            self.assertEqual(reader.read(), {'_default': {'1': {'a': 1}}})
+            reader.close()
+            writer.close()
+
+class TestProcessLock(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'db.lock')
+        self.lock = storage.ProcessLock(self.path)
+
+    def tearDown(self):
+        self.lock.close()
+        self.dir.cleanup()
+
+    def test_generation(self):
+        self.assertEqual(self.lock.generation(), 0)
+        with self.lock.exclusive():
+            self.assertEqual(self.lock.bump(), 1)
+        other = storage.ProcessLock(self.path)
+        self.assertEqual(other.generation(), 1)
+        other.close()
+
+    def test_reentrant(self):
+        with self.lock.exclusive():
+            with self.lock.exclusive():
+                with self.lock.shared():
+                    self.assertEqual(self.lock.depth, 2)
+        self.assertEqual(self.lock.depth, 0)
+
+    def test_excludes_other_holders(self):
+        other = storage.ProcessLock(self.path)
+        with self.lock.shared():
+            with other.shared():
+                pass
+            with self.assertRaises(BlockingIOError):
+                fcntl.flock(other.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        other.close()
@@ -0,0 +1,160 @@
+import unittest
+import os
+import tempfile
+import multiprocessing
+from unittest.mock import Mock
+from library import tinydb_backend
+
+class TestTinyDBBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'db.json')
+        self.backend = tinydb_backend.TinyDBBackend(self.path)
+        self.backend.storage.storage.write = Mock(wraps=self.backend.storage.storage.write)
+        self.record = {'fname': 'a', 'lname': 'b', 'age': 1, 'memberID': 3, 'borrowed_books': []}
+
+    def tearDown(self):
+        self.backend.close()
+        self.dir.cleanup()
+
+    def writes(self):
+        return self.backend.storage.storage.write.call_count
+
+    def test_insert_indexed(self):
+        doc_id = self.backend.insert(self.record)
+        self.assertEqual(self.backend.index, {3: doc_id})
+        self.assertTrue(self.backend.contains(3))
+
+    def test_build_index(self):
+        doc_id = self.backend.insert(self.record)
+        self.backend.close()
+        self.backend = tinydb_backend.TinyDBBackend(self.path)
+        self.assertEqual(self.backend.index, {3: doc_id})
+
+    def test_get_by_doc_id(self):
+        self.backend.insert(self.record)
+        self.backend.db.search = Mock()
+        self.assertEqual(self.backend.get(3), self.record)
+        self.backend.db.search.assert_not_called()
+
+    def test_update(self):
+        self.backend.insert(self.record)
+        self.backend.db.update = Mock()
+        self.assertTrue(self.backend.update(self.record))
+        self.backend.db.update.assert_called_with(self.record, doc_ids=[self.backend.index[3]])
+        self.assertFalse(self.backend.update(dict(self.record, memberID=4)))
+
+    def test_remove(self):
+        self.backend.insert(self.record)
+        self.assertTrue(self.backend.remove(3))
+        self.assertEqual(self.backend.index, {})
+        self.assertEqual(self.backend.count(), 0)
+        self.assertFalse(self.backend.remove(3))
+
+    def test_write_through_by_default(self):
+        self.backend.insert(self.record)
+        self.backend.insert(dict(self.record, memberID=4))
+        self.assertEqual(self.writes(), 2)
+
+    #Inserts ten records in a transaction and verifies they take one write
+    def test_transaction_single_write(self):
+        with self.backend.transaction():
+            for memberID in range(10):
+                self.backend.insert(dict(self.record, memberID=memberID))
+        self.assertEqual(self.writes(), 1)
+        self.backend.close()
+        self.backend = tinydb_backend.TinyDBBackend(self.path)
+        self.assertEqual(self.backend.count(), 10)
+
+    def test_transaction_rollback_rebuilds_index(self):
+        with self.assertRaises(ValueError):
+            with self.backend.transaction():
+                self.backend.insert(self.record)
+                raise ValueError()
+        self.assertEqual(self.backend.index, {})
+
+    def test_write_behind(self):
+        self.backend.close()
+        self.backend = tinydb_backend.TinyDBBackend(self.path, write_behind=True, flush_every=5)
+        self.backend.storage.storage.write = Mock(wraps=self.backend.storage.storage.write)
+        for memberID in range(7):
+            self.backend.insert(dict(self.record, memberID=memberID))
+        self.assertEqual(self.writes(), 1)
+        self.backend.close()
+        self.assertEqual(self.writes(), 2)
+        self.backend = tinydb_backend.TinyDBBackend(self.path)
+        self.assertEqual(self.backend.count(), 7)
+
+def insert_range(path, start, stop):
+    backend = tinydb_backend.TinyDBBackend(path, shared=True)
+    for memberID in range(start, stop):
+        backend.insert({'fname': 'a', 'lname': 'b', 'age': 1, 'memberID': memberID,
+                        'borrowed_books': []})
+    backend.close()
+
+class TestSharedTinyDBBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'db.json')
+        self.first = tinydb_backend.TinyDBBackend(self.path, shared=True)
+        self.second = tinydb_backend.TinyDBBackend(self.path, shared=True)
+        self.record = {'fname': 'a', 'lname': 'b', 'age': 1, 'memberID': 3, 'borrowed_books': []}
+
+    def tearDown(self):
+        self.first.close()
+        self.second.close()
+        self.dir.cleanup()
+
+    def test_sees_other_writes(self):
+        self.first.insert(self.record)
+        self.assertEqual(self.second.get(3), self.record)
+        self.second.update(dict(self.record, borrowed_books=['book1']))
+        self.assertEqual(self.first.get(3)['borrowed_books'], ['book1'])
+        self.second.remove(3)
+        self.assertFalse(self.first.contains(3))
+
+    def test_document_ids_not_reused(self):
+        self.first.insert(self.record)
+        self.second.insert(dict(self.record, memberID=4))
+        self.first.insert(dict(self.record, memberID=5))
+        self.assertEqual(self.second.count(), 3)
+        self.assertEqual(len(set(self.second.index.values())), 3)
+
+    #Reads the database repeatedly and verifies the file is only read again after a write
+    def test_reuses_cache_until_written(self):
+        self.first.insert(self.record)
+        self.second.get(3)
+        self.second.storage.storage.read = Mock(wraps=self.second.storage.storage.read)
+        for i in range(5):
+            self.second.get(3)
+            self.second.count()
+        self.second.storage.storage.read.assert_not_called()
+        self.first.remove(3)
+        self.assertIsNone(self.second.get(3))
+        self.assertEqual(self.second.storage.storage.read.call_count, 1)
+
+    def test_transaction_rollback(self):
+        self.first.insert(self.record)
+        with self.assertRaises(ValueError):
+            with self.first.transaction():
+                self.first.remove(3)
+                raise ValueError()
+        self.assertTrue(self.second.contains(3))
+        self.assertTrue(self.first.contains(3))
+
+    def test_no_write_behind(self):
+        with self.assertRaises(ValueError):
+            tinydb_backend.TinyDBBackend(self.path, write_behind=True, shared=True)
+
+    def test_processes_do_not_lose_writes(self):
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=insert_range, args=(self.path, i * 25, i * 25 + 25))
+                   for i in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.first.count(), 100)
+        self.assertEqual(sorted(self.first.index), list(range(100)))
@@ -1,7 +1,7 @@
 import sys
 sys.path.append('.')
 
-from library import ext_api_interface
+from library import ext_api_interface, response_store
 import json
 
 
@@ -23,6 +23,14 @@ class GetData:
         with open('tests_data/json_data.txt', 'w') as f:
             f.write(json.dumps(json_data))
 
+    def record(self, books, path='tests_data/responses'):
+        store = response_store.ResponseStore(path, response_store.ResponseStore.RECORD)
+        api = ext_api_interface.Books_API(store=store)
+        for book in books:
+            print("record: " + book)
+            api.get_book_info(book)
+        store.close()
+
 if __name__ == "__main__":
     getdata = GetData()
     getdata.get_ebooks('learning python')